@@ -59,6 +59,8 @@ logger = logging.getLogger(__name__)
 try:
     processor = ResumeMateProcessor()
     logger.info("ResumeMate 處理器初始化成功")
+    # 預熱嵌入模型與向量索引，避免第一位使用者承擔載入延遲
+    processor.warmup()
 except Exception as e:
     logger.error(f"初始化處理器失敗: {e}")
     processor = None
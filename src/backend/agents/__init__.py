@@ -2,9 +2,28 @@
 
 Expose AnalysisAgent and EvaluateAgent for top-level imports like:
         from backend.agents import AnalysisAgent, EvaluateAgent
+
+The agent modules pull in the Agents SDK and pydantic models, so they are
+imported lazily on first attribute access instead of at package import.
 """
 
-from .analysis import AnalysisAgent
-from .evaluate import EvaluateAgent
+import importlib
 
 __all__ = ["AnalysisAgent", "EvaluateAgent"]
+
+_LAZY_ATTRS = {
+    "AnalysisAgent": ".analysis",
+    "EvaluateAgent": ".evaluate",
+}
+
+
+def __getattr__(name: str):
+    """Lazily import agent classes from their submodules on first access."""
+    if name in _LAZY_ATTRS:
+        module = importlib.import_module(_LAZY_ATTRS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__} has no attribute {name}")
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
@@ -6,11 +6,18 @@
 from __future__ import annotations
 
 import os
-import json
+import sys
+import asyncio
+import enum
+import itertools
+import re
 from dotenv import load_dotenv
 import logging
-from typing import List, Dict, Literal, Any
-from pydantic import BaseModel, Field, ConfigDict
+import unicodedata
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, model_validator
 
 # 確保 Runner 已正確引入
 from agents import (
@@ -20,18 +27,25 @@ from agents import (
     function_tool,
     ModelSettings,
 )  # noqa: F401
-from backend.tools.rag import RAGTools
+
+if TYPE_CHECKING:
+    from backend.tools.rag import RAGTools
 
 # from models import SearchResult  # 工具回傳以 JSON dict 為主，避免序列化問題
 
+from backend.cache import TTLCache, loop_bound_cache
 from backend.models import (
     Question,
     AnalysisResult,
     QuestionType,
     AgentDecision,
+    SearchResult,
 )
 
-load_dotenv(override=True)
+# 僅在程序內首次載入 .env，避免重複 import 時重新掃描檔案系統
+if not os.environ.get("_DOTENV_LOADED"):
+    load_dotenv(override=True)
+    os.environ["_DOTENV_LOADED"] = "1"
 
 logger = logging.getLogger(__name__)
 
@@ -100,6 +114,7 @@ DEFAULT_INSTRUCTIONS = """# 韓世翔 AI 履歷助理 - 問題分析代理
 ```
 問題關於：工作、技能、經驗、教育、專案、自我介紹、背景
 → 使用 rag_search_tool 工具
+→ 需要以多個關鍵詞或同義詞擴展檢索時，改用 rag_search_batch_tool 一次送出所有查詢
 → decision = "retrieve", question_type = "experience/skill/fact/other"
 ```
 
@@ -180,32 +195,215 @@ DEFAULT_INSTRUCTIONS = """# 韓世翔 AI 履歷助理 - 問題分析代理
 記住：你是韓世翔的專業代表，每個回答都要展現他的技術實力、解決問題的能力和個人魅力。讓用戶感受到與一位優秀技術專家對話的體驗。
 """
 
+# 回覆長度控制指令（依 AGENT_RESPONSE_LENGTH 選擇）
+_LENGTH_TEMPLATES: Dict[str, str] = {
+    "brief": """## 💬 回覆長度控制 - 簡潔模式
+- **目標長度**：1-2 句話，20-50 字
+- **內容重點**：僅核心資訊，去除背景描述
+- **適用場景**：快速問答、基礎資訊查詢
+- **語氣調整**：保持親切但更加直接""",
+    "detailed": """## 💬 回覆長度控制 - 詳細模式
+- **目標長度**：3-5 段落，100-200 字
+- **內容重點**：提供背景脈絡、具體範例、實務經驗
+- **適用場景**：技術深度問題、專案經驗分享
+- **語氣調整**：專業深入，展現技術思維過程""",
+    "normal": """## 💬 回覆長度控制 - 標準模式
+- **目標長度**：2-4 句話，50-100 字
+- **內容重點**：平衡簡潔性與完整性
+- **適用場景**：一般履歷問題、技能經驗查詢
+- **語氣調整**：自然對話，專業而親切""",
+}
+
 
 # =========================
 # 1) 嚴格輸出模型（只允許 6 欄）
 # =========================
+class AnalysisDecision(str, enum.Enum):
+    """Analysis Agent 可輸出的決策（AgentDecision 的子集）"""
+
+    RETRIEVE = "retrieve"
+    OUT_OF_SCOPE = "oos"
+    CLARIFY = "clarify"
+
+
+# LLM 輸出的 decision / question_type 常見變體 → 標準枚舉（模組層級，避免每次請求重建）
+_DECISION_MAP: Dict[str, AgentDecision] = {
+    "retrieve": AgentDecision.RETRIEVE,
+    "oos": AgentDecision.OUT_OF_SCOPE,
+    "out_of_scope": AgentDecision.OUT_OF_SCOPE,
+    "outofscope": AgentDecision.OUT_OF_SCOPE,
+    "outofscooe": AgentDecision.OUT_OF_SCOPE,
+    "clarify": AgentDecision.ASK_CLARIFY,
+    "ask_clarify": AgentDecision.ASK_CLARIFY,
+}
+
+_QTYPE_MAP: Dict[str, QuestionType] = {
+    **{qtype.value: qtype for qtype in QuestionType},
+    "skills": QuestionType.SKILL,
+    "experiences": QuestionType.EXPERIENCE,
+    "facts": QuestionType.FACT,
+    "contact_info": QuestionType.CONTACT,
+}
+
+
 class AnalysisOutput(BaseModel):
     """Analysis Agent 的結構化輸出"""
 
     model_config = ConfigDict(
-        extra="ignore"
-    )  # ✅ 寬容：自動忽略 LLM 輸出的額外欄位（如 description）
+        extra="ignore",  # ✅ 寬容：自動忽略 LLM 輸出的額外欄位（如 description）
+        validate_default=False,  # 預設值（空 list/dict）不需再驗證
+    )
 
     draft_answer: str = Field(..., description="根據檢索結果產生的初步回答")
     sources: List[str] = Field(default_factory=list, description="引用的資訊來源IDs")
     confidence: float = Field(..., ge=0.0, le=1.0, description="對回答的信心程度 (0-1)")
-    question_type: Literal["skill", "experience", "contact", "fact", "other"] = Field(
+    question_type: QuestionType = Field(
         ..., description="問題類型識別 (skill, experience, contact, fact, other)"
     )
-    decision: Literal["retrieve", "oos", "clarify"] = Field(
+    decision: AnalysisDecision = Field(
         ..., description="代理人決策 (retrieve, oos, clarify)"
     )
     metadata: Dict[str, Any] = Field(default_factory=dict, description="其他元數據")
 
+    @model_validator(mode="before")
+    @classmethod
+    def _fix_common_format_errors(cls, data: Any) -> Any:
+        """修正 LLM 常見的格式錯誤，與驗證在同一次解析中完成"""
+        if not isinstance(data, dict):
+            return data
+
+        if isinstance(data.get("decision"), list):
+            data["decision"] = data["decision"][0] if data["decision"] else "oos"
+
+        decision = data.get("decision")
+        if isinstance(decision, str):
+            mapped = _DECISION_MAP.get(decision.strip().lower())
+            data["decision"] = mapped.value if mapped else decision
+
+        question_type = data.get("question_type")
+        if isinstance(question_type, str):
+            data["question_type"] = _QTYPE_MAP.get(
+                question_type.strip().lower(), QuestionType.OTHER
+            )
+
+        if "sources" in data and not isinstance(data["sources"], list):
+            data["sources"] = (
+                [data["sources"]] if isinstance(data["sources"], str) else []
+            )
+
+        if "metadata" in data and data["metadata"] is None:
+            data["metadata"] = {}
+
+        if "confidence" in data and not isinstance(data["confidence"], (int, float)):
+            try:
+                data["confidence"] = float(data["confidence"])
+            except (ValueError, TypeError):
+                data["confidence"] = 0.5
+
+        return data
+
+
+# 模型設定不隨請求變動，整個程序共用
+_DEFAULT_MODEL_SETTINGS = ModelSettings(include_usage=True)
+
+
+@loop_bound_cache
+def _build_chat_model(proxy_model: str, api_base: str, api_key: str):
+    """建立（並快取）指向 LiteLLM Proxy 的模型實例
+
+    同一個 event loop 內相同 (model, base_url, api_key) 共用同一個 AsyncOpenAI
+    client，讓多個代理實例重用 HTTP 連線池；loop 改變時重建。
+    """
+    from openai import AsyncOpenAI
+    from agents.models.openai_chatcompletions import OpenAIChatCompletionsModel
+
+    # 建立 AsyncOpenAI client 指向 LiteLLM Proxy
+    client = AsyncOpenAI(
+        base_url=api_base,
+        api_key=api_key,
+    )
+
+    # 使用 OpenAIChatCompletionsModel（相容非 OpenAI 後端）
+    return OpenAIChatCompletionsModel(
+        model=proxy_model,
+        openai_client=client,
+    )
+
+
+# 匯入時即完成 core schema 建構，第一個請求只需負擔解析成本
+AnalysisOutput.model_rebuild()
+
+# 由 sources 重建的檢索結果上限（EvaluateAgent 只參考前幾筆）
+MAX_RETRIEVALS = 5
+
+
+def _mk_retrieval(source_id: str) -> SearchResult:
+    """將 source doc_id 轉換為檢索結果
+
+    欄位皆為已知合法值，直接以 model_construct 建立，
+    AnalysisResult 接收 SearchResult 實例時不會再逐筆由 dict 驗證轉換。
+    """
+    return SearchResult.model_construct(
+        doc_id=source_id,
+        score=0.8,  # 預設分數，表示高相關性
+        excerpt="".join(("來自文件 ", source_id, " 的內容")),
+        metadata={"source_filename": source_id},
+    )
+
+
+# 模組層級共用的驗證器，str / dict 兩種輸入都走同一個 core validator
+_ANALYSIS_VALIDATOR: TypeAdapter[AnalysisOutput] = TypeAdapter(AnalysisOutput)
+
+
+@lru_cache(maxsize=4)
+def _full_instructions_for(length_instructions: str) -> str:
+    """組合並 intern 完整 instructions
+
+    Agents SDK 的 instructions 只接受 str（或產生 str 的函式），無法傳入預先編碼的
+    bytes；因此改為每種回覆長度只組合一次並 intern，讓多個代理共用同一物件。
+    """
+    return sys.intern(DEFAULT_INSTRUCTIONS + "\n\n" + length_instructions)
+
+
+@lru_cache(maxsize=4)
+def _cached_output_schema(cls: type, strict: bool) -> AgentOutputSchema:
+    """快取 AgentOutputSchema，避免每次建立代理時重新產生 JSON schema"""
+    return AgentOutputSchema(cls, strict_json_schema=strict)
+
 
 # =========================
 # 2) Tool：RAG 檢索（JSON-safe）
 # =========================
+_CONTACT_INFO: Dict[str, str] = {"name": "韓世翔", "email": "sacahan@gmail.com"}
+
+# 明確詢問聯絡方式的問題（對應 instructions 規則 1），無需經過 LLM 即可回答
+# 只比對向本人索取聯絡方式的句型，避免誤攔「與客戶聯繫」「email 行銷」等經歷問題
+_CONTACT_PATTERN = re.compile(
+    r"(怎麼|如何|怎樣).{0,6}(聯絡|聯繫|联系|找到)你"
+    r"|你的(聯絡|聯繫|联系|信箱|e-?mail|電話|line)"
+    r"|(聯絡|聯繫|联系)(方式|資訊)"
+    r"|\b(your|ur)\s+(e-?mail|phone|contact|line\s*id)\b"
+    r"|\b(contact|reach)\s+(you|info|information|details)\b",
+    re.IGNORECASE,
+)
+
+
+def _is_contact_question(text: str) -> bool:
+    """判斷是否為詢問聯絡方式的問題"""
+    return bool(text) and _CONTACT_PATTERN.search(text) is not None
+
+
+def _called_tools(result: Any) -> set:
+    """從 RunResult.new_items 取出本次執行實際呼叫的工具名稱"""
+    names = set()
+    for item in getattr(result, "new_items", None) or ():
+        if getattr(item, "type", None) == "tool_call_item":
+            name = getattr(getattr(item, "raw_item", None), "name", None)
+            if name:
+                names.add(name)
+    return names
+
+
 @function_tool
 def get_contact_info() -> Dict[str, str]:
     """獲取韓世翔的聯絡資訊。當用戶詢問如何聯絡我、我的email、聯絡方式等問題時使用此工具。
@@ -213,23 +411,30 @@ def get_contact_info() -> Dict[str, str]:
     Returns:
         Dict[str, str]: 包含姓名和email的聯絡資訊
     """
-    return {"name": "韓世翔", "email": "sacahan@gmail.com"}
+    return dict(_CONTACT_INFO)
+
 
+def get_rag_tools_instance() -> "RAGTools":
+    """獲取 RAG 工具單例實例（整個程序共用同一個向量索引與嵌入快取）"""
+    # 延遲匯入：僅在首次檢索時才載入 chromadb / sentence-transformers
+    from backend.tools.rag import get_default_rag_tools
 
-# 全域 RAG 工具實例，避免重複初始化
-_rag_tools_instance = None
+    return get_default_rag_tools()
 
 
-def get_rag_tools_instance() -> RAGTools:
-    """獲取 RAG 工具單例實例"""
-    global _rag_tools_instance
-    if _rag_tools_instance is None:
-        _rag_tools_instance = RAGTools()
-    return _rag_tools_instance
+def warmup_analysis_agent() -> None:
+    """在程序啟動時預熱嵌入模型與向量索引，避免第一個問題承擔載入成本"""
+    try:
+        start = time.time()
+        rag_tools = get_rag_tools_instance()
+        rag_tools.warmup()
+        logger.info(f"🔥 RAG 預熱完成 ({time.time() - start:.2f}s)")
+    except Exception as e:
+        logger.warning(f"RAG 預熱失敗，將於首次查詢時載入: {e}")
 
 
 @function_tool
-def rag_search_tool(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+async def rag_search_tool(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
     """搜索履歷資料庫以獲取相關履歷片段。對任何履歷相關問題都應優先使用此工具。
 
     適用於：技能查詢、工作經驗、教育背景、聯絡方式、項目經歷、個人資訊等所有履歷相關問題。
@@ -241,54 +446,139 @@ def rag_search_tool(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         List[dict]: 搜索結果列表，每個包含 doc_id, score, excerpt, metadata
     """
     try:
-        rag_tools = get_rag_tools_instance()
-        results = rag_tools.rag_search(query, top_k=top_k)
-
-        ### results reference:
-        # [
-        #     SearchResult(
-        #         doc_id="xxx.md_2",
-        #         score=0.38501596450805664,
-        #         excerpt="技術領導能力。近年積極投入AI/ML相關技術研發...",
-        #         metadata={
-        #             "start": 2000,
-        #             "source_filename": "xxx.md",
-        #             "end": 3000,
-        #             "chunk_index": 2,
-        #         },
-        #     ),
-        #     ...
-        # ]
-        ###
-
-        # 統一轉為可序列化 dict
-        formatted_results: List[Dict[str, Any]] = []
-        for r in results:
-            # r 可能是自定義物件；統一轉型
-            formatted_results.append(
-                {
-                    "doc_id": str(getattr(r, "doc_id", None) or r.get("doc_id")),
-                    "score": float(getattr(r, "score", 0.0) or r.get("score", 0.0)),
-                    "excerpt": str(getattr(r, "excerpt", "") or r.get("excerpt", "")),
-                    "metadata": dict(
-                        getattr(r, "metadata", {}) or r.get("metadata", {})
-                    ),
-                }
-            )
-        return formatted_results[:top_k]
+        # 嵌入與向量檢索為同步阻塞呼叫，移至執行緒避免卡住事件迴圈
+        # 欄位陣列形式：(doc_ids, scores, excerpts, metadatas)，以 zip 組裝 dict
+        doc_ids, scores, excerpts, metadatas = await _singleflight_search(
+            query, top_k
+        )
+        return [
+            {"doc_id": d, "score": s, "excerpt": e, "metadata": m}
+            for d, s, e, m in zip(doc_ids, scores, excerpts, metadatas)
+        ][:top_k]
     except Exception as e:
         logger.error(f"rag_search_tool 執行錯誤: {e}")
         return []
 
 
+@function_tool
+async def rag_search_batch_tool(
+    queries: List[str], top_k: int = 5
+) -> List[List[Dict[str, Any]]]:
+    """一次搜索多個查詢（原始問題 + 同義詞/擴展關鍵詞），只做一次嵌入與向量檢索。
+
+    需要以多個關鍵詞檢索履歷時，應優先使用此工具，而非多次呼叫 rag_search_tool。
+
+    Args:
+        queries: 搜索查詢詞彙列表，例如 ["機器學習經驗", "AI 專案", "深度學習"]
+        top_k: 每個查詢返回的結果數量，建議 3-10 個結果
+    Returns:
+        List[List[dict]]: 與 queries 順序對應的搜索結果列表
+    """
+    try:
+        batch_results = await asyncio.to_thread(_search_batch, queries, top_k)
+        return [_format_results(results, top_k) for results in batch_results]
+    except Exception as e:
+        logger.error(f"rag_search_batch_tool 執行錯誤: {e}")
+        return [[] for _ in queries]
+
+
+# 進行中的檢索 (query, top_k) -> Task；相同查詢併發時只實際執行一次
+_inflight_searches: Dict[Tuple[str, int], "asyncio.Task"] = {}
+
+
+async def _singleflight_search(query: str, top_k: int):
+    """合併進行中的相同檢索請求，其餘呼叫者等待同一個結果"""
+    key = (query, top_k)
+    task = _inflight_searches.get(key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        # 檢索 task 不屬於任何呼叫者，首位呼叫者取消也不會中斷其他等待者
+        task = asyncio.ensure_future(asyncio.to_thread(_search_soa, query, top_k))
+        _inflight_searches[key] = task
+        task.add_done_callback(lambda t: _discard_inflight(key, t))
+    # shield：任一等待者（包含首位）取消時不影響其他人
+    return await asyncio.shield(task)
+
+
+def _discard_inflight(key: Tuple[str, int], task: "asyncio.Task") -> None:
+    """檢索完成後移除登記，並標記例外已讀取避免無人等待時的警告"""
+    if _inflight_searches.get(key) is task:
+        del _inflight_searches[key]
+    if not task.cancelled():
+        task.exception()
+
+
+def _search_soa(query: str, top_k: int):
+    """在工作執行緒中執行單一查詢（含首次載入 RAG 實例）"""
+    return get_rag_tools_instance().rag_search_soa(query, top_k=top_k)
+
+
+def _search_batch(queries: List[str], top_k: int) -> List[List[Any]]:
+    """在工作執行緒中執行批次查詢"""
+    return get_rag_tools_instance().rag_search_batch(queries, top_k=top_k)
+
+
+def _format_results(results: List[Any], top_k: int) -> List[Dict[str, Any]]:
+    """將檢索結果統一轉為可序列化 dict
+
+    依第一筆結果判斷型別後走單一路徑，並先截斷到 top_k 再轉換。
+    """
+    results = results[:top_k]
+    if not results:
+        return []
+
+    # 快速路徑：RAGTools 回傳的是 SearchResult，直接存取欄位
+    if isinstance(results[0], SearchResult):
+        return [
+            {
+                "doc_id": r.doc_id,
+                "score": float(r.score),
+                "excerpt": r.excerpt,
+                "metadata": r.metadata,
+            }
+            for r in results
+        ]
+
+    # dict 結果（例如外部呼叫者或快取還原的資料）
+    if isinstance(results[0], dict):
+        return [
+            {
+                "doc_id": str(r.get("doc_id")),
+                "score": float(r.get("score") or 0.0),
+                "excerpt": str(r.get("excerpt") or ""),
+                "metadata": dict(r.get("metadata") or {}),
+            }
+            for r in results
+        ]
+
+    # 其他自定義物件：以屬性存取
+    return [
+        {
+            "doc_id": str(getattr(r, "doc_id", None)),
+            "score": float(getattr(r, "score", 0.0) or 0.0),
+            "excerpt": str(getattr(r, "excerpt", "") or ""),
+            "metadata": dict(getattr(r, "metadata", None) or {}),
+        }
+        for r in results
+    ]
+
+
 class AnalysisAgent:
     """Analysis Agent - 問題分析與檢索代理人"""
 
     def __init__(self, llm: str = "gpt-4o-mini"):
         self.llm_model, self.llm_settings = self._create_litellm_model_and_settings()
         self.response_length = os.environ.get("AGENT_RESPONSE_LENGTH", "normal")
+        # 完整 instructions 依回覆長度在程序內只組合一次，所有實例共用同一字串物件
+        self._full_instructions = _full_instructions_for(
+            self._get_response_length_instructions()
+        )
         self.sdk_agent = None
         self._initialize_sdk_agent()
+        # 完全相同（正規化後）的問題直接回傳先前的分析結果，省去整輪 LLM 呼叫
+        self._result_cache = TTLCache(
+            maxsize=int(os.getenv("ANALYSIS_CACHE_SIZE", "5000")),
+            ttl_seconds=float(os.getenv("ANALYSIS_CACHE_TTL", "3600")),
+        )
 
     def _create_litellm_model_and_settings(self):
         """創建 OpenAI 模型實例和 ModelSettings
@@ -299,9 +589,6 @@ class AnalysisAgent:
         Note:
             使用 OpenAI SDK 直接連接 LiteLLM Proxy，避免 LiteLLM 內部的認證邏輯。
         """
-        from openai import AsyncOpenAI
-        from agents.models.openai_chatcompletions import OpenAIChatCompletionsModel
-
         # 使用 LiteLLM Proxy 配置
         api_key = os.getenv("LITELLM_PROXY_API_KEY")
         api_base = os.getenv("LITELLM_PROXY_API_BASE")
@@ -316,30 +603,16 @@ class AnalysisAgent:
         logger.info(f"📡 使用 LiteLLM Proxy: {api_base}")
         logger.info(f"📡 Proxy Model: {proxy_model}")
 
-        # 建立 AsyncOpenAI client 指向 LiteLLM Proxy
-        client = AsyncOpenAI(
-            base_url=api_base,
-            api_key=api_key,
-        )
-
-        # 使用 OpenAIChatCompletionsModel（相容非 OpenAI 後端）
-        llm_model = OpenAIChatCompletionsModel(
-            model=proxy_model,
-            openai_client=client,
-        )
-
-        model_settings = ModelSettings(include_usage=True)
+        # 保留設定，執行時依目前 event loop 取得對應的模型 client
+        self._model_key = (proxy_model, api_base, api_key)
+        llm_model = _build_chat_model(*self._model_key)
 
         logger.info(f"✅ OpenAI 模型已建立: {proxy_model}")
-        return llm_model, model_settings
+        return llm_model, _DEFAULT_MODEL_SETTINGS
 
     def _initialize_sdk_agent(self):
         """初始化 Agent"""
         try:
-            # 根據回覆長度設定調整 instructions
-            response_instructions = self._get_response_length_instructions()
-            full_instructions = DEFAULT_INSTRUCTIONS + "\n\n" + response_instructions
-
             # 建立基礎 ModelSettings
             base_settings = ModelSettings(
                 # tool_choice="required",  # 🔥 強制使用工具確保檢索履歷內容
@@ -359,37 +632,30 @@ class AnalysisAgent:
             # - 溫度參數調優確保回答品質一致性
             self.sdk_agent = Agent(
                 name="韓世翔履歷分析助理",
-                instructions=full_instructions,
-                tools=[get_contact_info, rag_search_tool],
+                instructions=self._full_instructions,
+                tools=[get_contact_info, rag_search_tool, rag_search_batch_tool],
                 model=self.llm_model,
                 model_settings=base_settings,
-                output_type=AgentOutputSchema(AnalysisOutput, strict_json_schema=False),
+                output_type=_cached_output_schema(AnalysisOutput, False),
             )
             logger.info("🚀 韓世翔履歷分析助理初始化成功")
             logger.info("✅ 已啟用智慧工具選擇與品質控制機制")
         except Exception as e:
             logger.error(f"初始化 Analysis Agent 失敗: {e}")
 
+    def _sdk_agent_for_running_loop(self) -> Optional[Agent]:
+        """取得模型 client 綁定目前 event loop 的 Agent（loop 改變時換用新 client）"""
+        model = _build_chat_model(*self._model_key)
+        if self.sdk_agent is not None and model is not self.llm_model:
+            self.llm_model = model
+            self.sdk_agent = self.sdk_agent.clone(model=model)
+        return self.sdk_agent
+
     def _get_response_length_instructions(self) -> str:
         """根據環境變數設定回傳回覆長度控制指令"""
-        if self.response_length.lower() == "brief":
-            return """## 💬 回覆長度控制 - 簡潔模式
-- **目標長度**：1-2 句話，20-50 字
-- **內容重點**：僅核心資訊，去除背景描述
-- **適用場景**：快速問答、基礎資訊查詢
-- **語氣調整**：保持親切但更加直接"""
-        elif self.response_length.lower() == "detailed":
-            return """## 💬 回覆長度控制 - 詳細模式
-- **目標長度**：3-5 段落，100-200 字
-- **內容重點**：提供背景脈絡、具體範例、實務經驗
-- **適用場景**：技術深度問題、專案經驗分享
-- **語氣調整**：專業深入，展現技術思維過程"""
-        else:  # normal
-            return """## 💬 回覆長度控制 - 標準模式
-- **目標長度**：2-4 句話，50-100 字
-- **內容重點**：平衡簡潔性與完整性
-- **適用場景**：一般履歷問題、技能經驗查詢
-- **語氣調整**：自然對話，專業而親切"""
+        return _LENGTH_TEMPLATES.get(
+            self.response_length.lower(), _LENGTH_TEMPLATES["normal"]
+        )
 
     # -------------------------
     # 安全解析輔助：避免 Invalid JSON
@@ -400,8 +666,13 @@ class AnalysisAgent:
         由於使用 extra="ignore"，Pydantic 會自動忽略額外欄位（如 description），
         所以無需手動清洗 schema 相關欄位。
         """
+        # 常見情況：SDK 已依 output_type 解析為 AnalysisOutput，直接回傳
+        final_output = getattr(result, "final_output", None)
+        if isinstance(final_output, AnalysisOutput):
+            return final_output
+
         try:
-            # 嘗試 SDK 的 final_output_as
+            # 型別不符時才嘗試 SDK 的 final_output_as
             return result.final_output_as(AnalysisOutput)
         except Exception as e:
             logger.warning(f"final_output_as 失敗，嘗試手動解析：{e}")
@@ -413,36 +684,15 @@ class AnalysisAgent:
             return None
 
         try:
+            # 格式修正由 AnalysisOutput 的 before validator 處理；
+            # 字串直接交給 validate_json，單次解析 + 驗證
             if isinstance(raw, str):
-                data = json.loads(raw)
-            elif isinstance(raw, dict):
-                data = raw
-            else:
-                logger.error(f"未知輸出型別：{type(raw)}")
-                return None
-
-            # 修正常見的格式錯誤
-            if "decision" in data and isinstance(data["decision"], list):
-                data["decision"] = data["decision"][0] if data["decision"] else "oos"
-
-            if "sources" in data and not isinstance(data["sources"], list):
-                data["sources"] = (
-                    [data["sources"]] if isinstance(data["sources"], str) else []
-                )
-
-            if "metadata" in data and data["metadata"] is None:
-                data["metadata"] = {}
-
-            if "confidence" in data and not isinstance(
-                data["confidence"], (int, float)
-            ):
-                try:
-                    data["confidence"] = float(data["confidence"])
-                except (ValueError, TypeError):
-                    data["confidence"] = 0.5
+                return _ANALYSIS_VALIDATOR.validate_json(raw)
+            if isinstance(raw, dict):
+                return _ANALYSIS_VALIDATOR.validate_python(raw)
 
-            # 由於 extra="ignore"，額外欄位會被自動忽略
-            return AnalysisOutput.model_validate(data)
+            logger.error(f"未知輸出型別：{type(raw)}")
+            return None
         except Exception as e:
             logger.error(f"手動解析輸出失敗：{e}")
             return None
@@ -450,24 +700,102 @@ class AnalysisAgent:
     async def analyze(self, question: Question) -> AnalysisResult:
         """分析問題並執行檢索"""
         logger.info(f"開始分析問題: {getattr(question, 'text', '')}")
+        if _is_contact_question(getattr(question, "text", "")):
+            logger.info("📇 聯絡資訊問題，直接回覆不呼叫 LLM")
+            return self._contact_result(question)
+
+        cache_key = self._result_cache_key(question)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            logger.info("✨ 分析結果快取命中")
+            # 回傳副本，呼叫端（processor）會修改 metadata
+            return cached.model_copy(deep=True)
+
         try:
-            return await self._analyze_with_sdk(question)
+            result = await self._analyze_with_sdk(question)
         except Exception as e:
             logger.error(f"分析問題時發生錯誤: {e}")
-            return AnalysisResult(
-                query=getattr(question, "text", ""),
-                question_type=QuestionType.OTHER,
-                decision=AgentDecision.OUT_OF_SCOPE,
-                confidence=0.0,
-                retrievals=[],
-                draft_answer="",
-                metadata={"error": str(e)},
-            )
+            return self._error_result(question, e)
+
+        # 只快取成功的分析結果
+        if not result.metadata.get("error"):
+            self._result_cache.set(cache_key, result.model_copy(deep=True))
+        return result
+
+    def _result_cache_key(self, question: Question) -> tuple:
+        """正規化問題文字（NFKC、大小寫、空白）作為快取鍵"""
+        text = unicodedata.normalize("NFKC", getattr(question, "text", "") or "")
+        return (" ".join(text.lower().split()), self.response_length)
+
+    async def analyze_many(
+        self, questions: List[Question], concurrency_limit: int | None = None
+    ) -> List[AnalysisResult]:
+        """並行分析多個問題，結果順序與輸入一致
+
+        Args:
+            questions: 問題列表
+            concurrency_limit: 同時進行的 LLM 請求上限，預設讀取
+                ANALYSIS_MAX_CONCURRENCY（4），避免超過 Proxy 速率限制
+
+        Returns:
+            List[AnalysisResult]: 分析結果；個別失敗時回傳 OUT_OF_SCOPE 預設值
+        """
+        if concurrency_limit is None:
+            concurrency_limit = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "4"))
+        semaphore = asyncio.Semaphore(max(1, concurrency_limit))
+
+        async def _bounded(question: Question) -> AnalysisResult:
+            async with semaphore:
+                return await self.analyze(question)
+
+        results = await asyncio.gather(
+            *(_bounded(q) for q in questions), return_exceptions=True
+        )
+        return [
+            self._error_result(question, r) if isinstance(r, BaseException) else r
+            for question, r in zip(questions, results)
+        ]
+
+    @staticmethod
+    def _contact_result(question: Question) -> AnalysisResult:
+        """聯絡資訊問題的固定回覆（與 get_contact_info 工具結果一致）"""
+        return AnalysisResult(
+            query=question.text,
+            question_type=QuestionType.CONTACT,
+            decision=AgentDecision.RETRIEVE,
+            confidence=1.0,
+            retrievals=[],
+            draft_answer=(
+                f"歡迎透過 email 與我聯絡：{_CONTACT_INFO['email']}，"
+                "我會盡快回覆你！"
+            ),
+            metadata={
+                "source": "get_contact_info",
+                "used_contact_info_tool": True,
+                "contact": dict(_CONTACT_INFO),
+                "short_circuit": True,
+            },
+        )
+
+    @staticmethod
+    def _error_result(question: Question, error: BaseException) -> AnalysisResult:
+        """分析失敗時的安全預設值"""
+        return AnalysisResult(
+            query=getattr(question, "text", ""),
+            question_type=QuestionType.OTHER,
+            decision=AgentDecision.OUT_OF_SCOPE,
+            confidence=0.0,
+            retrievals=[],
+            draft_answer="",
+            metadata={"error": str(error)},
+        )
 
     async def _analyze_with_sdk(self, question: Question) -> AnalysisResult:
         """使用 OpenAI Agents SDK 分析問題"""
         try:
-            result = await Runner.run(self.sdk_agent, input=question.text)
+            result = await Runner.run(
+                self._sdk_agent_for_running_loop(), input=question.text
+            )
             logger.info(f"Analysis Agent 回覆: {result}")
         except Exception as e:
             logger.error(f"執行 Analysis Agent 時發生錯誤: {e}")
@@ -481,6 +809,10 @@ class AnalysisAgent:
                 metadata={"error": str(e), "sdk_result": False},
             )
 
+        # 只取一次 SDK 結果欄位，後續流程共用
+        raw_output = getattr(result, "output", None)
+        usage = getattr(result, "usage", None)
+
         # 解析結構化輸出（具備自我修復）
         output = self._safe_parse_output(result)
         if output is None:
@@ -495,57 +827,28 @@ class AnalysisAgent:
                 draft_answer="",
                 metadata={
                     "error": "failed_to_parse_output",
-                    "raw_output": getattr(result, "output", None),
+                    "raw_output": raw_output,
                 },
             )
 
-        # 將字串映射到內部 Enum；若失敗則回退到 OTHER / OUT_OF_SCOPE
-        try:
-            question_type = QuestionType(output.question_type)
-        except Exception:
-            question_type = QuestionType.OTHER
+        # 變體已在 AnalysisOutput 驗證時標準化，這裡只做枚舉對應
+        question_type = output.question_type
+        decision = _DECISION_MAP.get(output.decision.value, AgentDecision.OUT_OF_SCOPE)
 
-        try:
-            # 標準化 decision 值，處理大小寫問題
-            decision_value = output.decision.lower().strip()
-
-            # 映射常見變體到正確的 AgentDecision 枚舉值
-            decision_mapping = {
-                "oos": "oos",
-                "out_of_scope": "oos",
-                "outofscooe": "oos",
-                "retrieve": "retrieve",
-                "clarify": "clarify",
-                "ask_clarify": "clarify",
-            }
-
-            normalized_decision = decision_mapping.get(decision_value, decision_value)
-            decision = AgentDecision(normalized_decision)
-        except Exception as e:
-            # 只有在真正無法解析時才設為 OUT_OF_SCOPE，並記錄詳細錯誤
-            logger.warning(
-                f"Decision 解析失敗 '{output.decision}': {e}，使用預設值 OUT_OF_SCOPE"
-            )
-            decision = AgentDecision.OUT_OF_SCOPE
-
-        # 從 sources 重建檢索結果以供 EvaluateAgent 使用
-        retrievals: List[Dict[str, Any]] = []
-        if output.sources:
-            # 將 sources (doc_ids) 轉換為檢索結果格式
-            for source_id in output.sources:
-                retrievals.append(
-                    {
-                        "doc_id": source_id,
-                        "score": 0.8,  # 預設分數，表示高相關性
-                        "excerpt": f"來自文件 {source_id} 的內容",
-                        "metadata": {"source_filename": source_id},
-                    }
-                )
+        # 從 sources 重建檢索結果以供 EvaluateAgent 使用（只取前 MAX_RETRIEVALS 筆）
+        # LLM 常重複引用同一 doc_id；保序去重後再建立檢索結果
+        unique_sources = list(dict.fromkeys(output.sources))
+        retrievals: List[SearchResult | Dict[str, Any]] = [
+            _mk_retrieval(source_id)
+            for source_id in itertools.islice(unique_sources, MAX_RETRIEVALS)
+        ]
 
         result_metadata: Dict[str, Any] = {
-            "raw_output": getattr(result, "output", None),
-            "usage": getattr(result, "usage", None),
-            "sources": output.sources,  # 確保 sources 也保存在 metadata 中
+            "raw_output": raw_output,
+            "usage": usage,
+            "sources": unique_sources,  # 確保 sources 也保存在 metadata 中
+            # 直接標記是否呼叫了聯絡資訊工具，EvaluateAgent 不必再掃描輸出文字
+            "used_contact_info_tool": "get_contact_info" in _called_tools(result),
         }
 
         # 若 LLM 在 metadata 裡有額外資訊，也一併帶出
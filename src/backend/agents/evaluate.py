@@ -6,221 +6,462 @@
 from __future__ import annotations
 
 import os
+import re
+import sys
+import asyncio
 import json
+import hashlib
+import time
+import uuid
+from pathlib import Path
 from dotenv import load_dotenv
 import logging
-from typing import List, Dict, Literal, Any, Optional
-from pydantic import BaseModel, Field, ConfigDict
+from collections import ChainMap
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
+from pydantic import (
+    AliasChoices,
+    BaseModel,
+    ConfigDict,
+    Field,
+    TypeAdapter,
+    field_validator,
+    model_validator,
+)
 
-# 確保 Runner 已正確引入
-from agents import Agent, Runner, AgentOutputSchema, ModelSettings
+from backend.cache import SemanticCache, TTLCache, loop_bound_cache
 from backend.models import (
     AnalysisResult,
     EvaluationResult,
     AgentDecision,
 )
 
+if TYPE_CHECKING:
+    from agents import Agent, AgentOutputSchema, ModelSettings
+
 load_dotenv(override=True)
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+    ORJSON_AVAILABLE = False
+
+
+def _dumps(obj: Any) -> str:
+    """緊湊、鍵排序的 JSON 序列化；有 orjson 時優先使用"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            obj,
+            default=str,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        ).decode("utf-8")
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str
+    )
+
 
 DEFAULT_INSTRUCTIONS = """# 韓世翔 AI 履歷助理 - 品質評估代理
 
 ## 核心職責
-你是韓世翔的 AI 品質評估助理，負責審查分析代理的輸出結果，確保提供給用戶的最終回答達到專業標準。你代表韓世翔本人進行最後的品質把關，維護他的專業形象。
+你是韓世翔的 AI 品質評估助理，審查分析代理的輸出並產生給用戶的最終回答。你代表韓世翔本人做最後把關：回答須準確、相關、對招募方與合作夥伴有實用價值，並判斷是否需要澄清或升級人工處理。
+
+## [A] 聯絡資訊規則
+任一成立即視為聯絡資訊查詢：`used_contact_info_tool = true`；`metadata.source = "get_contact_info"`；`question_type = "contact"` 且 `confidence > 0.8`。
+處理：`status = "ok"`、`confidence = 1.0`，直接提供聯絡資訊。
+
+## [B] 正常範圍（非超出範圍、非敏感）
+自我介紹、個人背景、工作經驗、技能、教育、專案經驗、職業規劃、工作理念、團隊合作、領導經驗，以及居住地、工作區域、聯絡方式等標準履歷資訊。
+
+## [C] 語氣標準
+- 第一人稱、自然流暢，如韓世翔親自回答：「我在...」、「我的專長是...」、「我擅長...」
+- 避免「根據履歷」、「資料顯示」等生硬用詞；可適度分享個人經驗感悟
+- 展現技術熱忱、專業自信（不驕傲）、團隊精神與解決導向
+- 技術用詞精準，專業中帶有溫度
+- 使用正體中文（zh_TW）
+
+## [D] 決策流程（優先級由高到低）
+1. 聯絡資訊 → 參見[A]
+2. 與職業生涯完全無關（天氣、娛樂八卦、烹飪食譜、體育賽事等；[B] 不屬此類）→ `out_of_scope`
+3. 真正敏感資訊（薪資、內部機密、家庭隱私等；[B] 不屬此類）→ `escalate_to_human`
+4. `analysis_confidence < 0.4`，或 `sources` 為空或不足 → `escalate_to_human`
+5. `confidence ∈ [0.4, 0.7)` 且涉及重要技術/經驗，或問題模糊可透過補充資訊解決 → `needs_clarification`，提供精準追問
+6. `confidence ≥ 0.7`、有可信來源支持，且草稿完整、準確、符合[C] → `ok`（可潤飾語氣）
+7. 內容基本正確但語氣不自然，小幅調整即可發布 → `needs_edit`，提供具體修改建議
+8. 其他情況 → 傾向 `escalate_to_human`
+
+### 內容檢核
+事實須基於檢索結果、不可虛構；至少 1 個可信來源支持主要論點；來源間無矛盾；技術問題展現適當專業深度。
+
+### 信心度
+聯絡資訊參見[A]；精確匹配 0.8–1.0；部分匹配 0.5–0.8；相關但不確定 0.2–0.5；不相關/錯誤 0.0–0.2。
+
+## [E] 輸出格式
+僅輸出以下 5 個欄位的 JSON，禁止 schema 欄位與額外說明文字：
+```json
+{
+  "final_answer": "第一人稱自然回答",
+  "sources": ["document_id_1"],
+  "confidence": 0.85,
+  "status": "ok|needs_edit|needs_clarification|out_of_scope|escalate_to_human",
+  "metadata": {"reason": "決策原因", "missing_fields": [], "original_question": "原始問題", "analysis_confidence": 0.75}
+}
+```
+
+範例：
+- 問「你在 AI 領域有什麼經驗？」→「我在 AI/ML 領域有超過5年的實務經驗，專精於機器學習模型開發和深度學習應用，曾主導多個成功的 AI 專案落地。」（ok, 0.9）
+- 問「你的專案經驗如何？」→「你希望了解哪個領域的專案經驗呢？比如 AI/ML 專案、系統架構設計，還是團隊管理經驗？」（needs_clarification）
+
+`escalate_to_human` 的 final_answer 一律使用範本:
+"由於目前可查到的資料無法保證答案正確性。是否同意我先記錄下問題，再由本人進行回覆？麻煩再提供聯絡方式（稱呼/Email/電話/Line）。"
+"""
 
-## 🎯 評估使命
-1. **品質驗證**：確保回答準確、相關且有價值
-2. **語氣調校**：維持韓世翔專業親和的個人風格
-3. **決策智慧**：判斷回答是否需要澄清或升級人工處理
-4. **用戶體驗**：提供對招募方和合作夥伴有實用價值的回答
+# ---------- JSON-safe type
+JsonValue = Any
+
+# 回覆長度控制指令（依 AGENT_RESPONSE_LENGTH 選擇）
+_LENGTH_TEMPLATES: Dict[str, str] = {
+    "brief": """## 📏 回覆長度控制 - 簡潔模式
+- **目標長度**: 1-2句話，直擊核心
+- **內容策略**: 僅保留最關鍵資訊，去除背景描述
+- **語氣調整**: 保持親切但更加直接明確
+- **適用場景**: 快速問答、基礎資訊確認""",
+    "normal": """## 📏 回覆長度控制 - 標準模式
+- **目標長度**: 2-4句話，平衡簡潔與完整性
+- **內容策略**: 核心資訊 + 適度背景，保持資訊密度
+- **語氣調整**: 自然對話，專業而親切
+- **適用場景**: 一般履歷問題、技能經驗查詢、日常互動""",
+    "detailed": """## 📏 回覆長度控制 - 詳細模式
+- **目標長度**: 3-5段落，提供完整脈絡
+- **內容策略**: 包含背景資訊、具體案例、實務經驗分享
+- **語氣調整**: 專業深入，展現技術思維與解決問題的過程
+- **適用場景**: 技術深度問題、專案經驗分享、複雜概念解釋""",
+}
+
+_CODE_FENCE = re.compile(r"(```.*?```)", re.DOTALL)
+_DECORATIVE_EMOJI = re.compile("[\U0001F300-\U0001FAFF\u2600-\u27BF\uFE0F]+ ?")
 
-## 💬 語氣與個性標準
 
-### ✅ 自然表達原則
-- **第一人稱自然化**：如韓世翔親自回答，語句流暢自然
-- **避免客觀描述**：拒絕「根據履歷」、「資料顯示」等生硬用詞
-- **個人化表達**：使用「我在...」、「我的專長是...」、「我擅長...」
-- **適度分享觀點**：加入個人經驗感悟，增加真實感
-- **正體中文**：確保使用 zh_TW 繁體字符
+def _compress_instructions(text: str) -> str:
+    """移除提示詞中對模型無意義的裝飾，降低每次請求的 prefill token
 
-### 🌟 個性特質展現
-- **技術熱忱**：對新技術保持積極學習態度
-- **專業自信**：展現技術實力但不驕傲
-- **團隊精神**：強調協作與溝通能力
-- **解決導向**：專注於實際問題解決
+    僅處理程式碼區塊（JSON 輸出格式）以外的文字：去除裝飾性 emoji 與
+    粗體標記、行尾空白，並將連續空行收斂為一行。
+    """
+    parts = _CODE_FENCE.split(text)
+    for i in range(0, len(parts), 2):
+        chunk = _DECORATIVE_EMOJI.sub("", parts[i]).replace("**", "")
+        chunk = re.sub(r"[ \t]+\n", "\n", chunk)
+        parts[i] = re.sub(r"\n{3,}", "\n\n", chunk)
+    return "".join(parts).strip()
 
-## 🔍 智慧決策流程
 
-### 決策優先級 (由高到低)
+# 完整 instructions 於匯入時壓縮、組合並 intern：同一模式永遠是同一個字串物件，
+# 每次建立代理不再重新串接，送出的系統提示也保持逐位元組一致（開頭固定不變，
+# 有利於 Proxy 端的前綴快取）
+_FULL_INSTRUCTIONS: Dict[str, str] = {
+    mode: sys.intern(_compress_instructions(DEFAULT_INSTRUCTIONS + "\n\n" + block))
+    for mode, block in _LENGTH_TEMPLATES.items()
+}
+
+# 送給 reviewer 的每筆檢索摘錄上限（字元）
+MAX_EXCERPT_CHARS = int(os.getenv("EVAL_MAX_EXCERPT", "300"))
+
+# 檢索結果的 metadata 評估時很少用到，僅在 DEBUG_EVAL 開啟時送給 reviewer
+_RETRIEVAL_DUMP_EXCLUDE = (
+    None
+    if os.getenv("DEBUG_EVAL", "").lower() in ("1", "true", "yes")
+    else {"__all__": {"metadata"}}
+)
 
-#### 1. 🏆 聯絡資訊查詢 [自動通過]
-**觸發條件** (任一滿足即可):
-- `used_contact_info_tool = true`
-- `question_type = "contact"` 且 `confidence > 0.8`
-- `metadata.source = "get_contact_info"`
+# 升級人工處理的統一話術（與 DEFAULT_INSTRUCTIONS 一致）
+ESCALATE_MESSAGE = (
+    "由於目前可查到的資料無法保證答案正確性。是否同意我先記錄下問題，"
+    "再由本人進行回覆？麻煩再提供聯絡方式（稱呼/Email/電話/Line）。"
+)
 
-**處理方式**: `status = "ok"`，直接提供聯絡資訊
+# 低於此信心度的分析直接升級人工處理（決策流程第 4 條）
+LOW_CONFIDENCE_THRESHOLD = 0.4
 
-#### 2. 🚫 完全超出範圍
-**觸發條件**:
-- 與職業生涯完全無關的問題 (天氣、娛樂八卦、烹飪食譜、體育賽事等)
-- ⚠️ **重要**：以下屬於正常範圍，不應歸類為超出範圍
-  * 自我介紹、個人背景、工作經驗
-  * 技能、教育、專案經驗
-  * 職業規劃、工作理念
-  * 團隊合作、領導經驗
+# 規則式快速路徑（EVAL_FAST_PATH）：超出範圍的統一婉拒話術，
+# 以及高信心度直接通過所需的信心度與來源支持度門檻
+OUT_OF_SCOPE_MESSAGE = (
+    "這個問題超出我的履歷範圍，歡迎詢問我的工作經驗、技能、專案或職涯規劃相關問題。"
+)
+HIGH_CONFIDENCE_THRESHOLD = 0.9
+SOURCE_SUPPORT_THRESHOLD = 0.7
 
-**處理方式**: `status = "out_of_scope"`
+# 每次請求都會變動、與評估無關的 metadata 欄位；排除後 reviewer 輸入才會穩定
+_VOLATILE_METADATA_KEYS = frozenset(
+    {"request_id", "analysis_time", "raw_output", "usage", "cached", "cache_age"}
+)
 
-#### 3. 🔒 真正敏感資訊
-**觸發條件**:
-- 薪資、內部機密、家庭隱私等
-- ⚠️ 注意：標準履歷資訊不屬敏感 (居住地、工作區域、聯絡方式、教育背景、技能經驗等)
 
-**處理方式**: `status = "escalate_to_human"`
+# 寬容輸出模型（自動忽略 LLM 的額外欄位）
+class EvaluateOutput(BaseModel):
+    model_config = ConfigDict(
+        extra="ignore"
+    )  # ✅ 寬容：自動忽略 LLM 輸出的額外欄位（如 description）
 
-#### 4. 📊 信心度過低
-**觸發條件**:
-- `analysis_confidence < 0.4`
-- `sources` 為空或不足
+    final_answer: str
+    # 改為字串列表以符合 Analysis Agent 輸出格式
+    sources: List[str] = Field(default_factory=list)
+    confidence: float = Field(ge=0.0, le=1.0)
+    status: Literal[
+        "ok",
+        "needs_edit",
+        "needs_clarification",
+        "out_of_scope",
+        "escalate_to_human",
+    ]
+    metadata: Dict[str, JsonValue] = Field(default_factory=dict)
 
-**處理方式**: `status = "escalate_to_human"`
+    @model_validator(mode="before")
+    @classmethod
+    def _fix_common_format_errors(cls, data: Any) -> Any:
+        """修正 LLM 常見的格式錯誤，與驗證在同一次解析中完成"""
+        if not isinstance(data, dict):
+            return data
 
-#### 5. ❓ 需要澄清
-**觸發條件**:
-- `confidence ∈ [0.4, 0.7)` 且涉及重要技術/經驗
-- 問題模糊，可通過補充具體資訊解決
+        if "sources" in data and not isinstance(data["sources"], list):
+            data["sources"] = (
+                [data["sources"]] if isinstance(data["sources"], str) else []
+            )
 
-**處理方式**: `status = "needs_clarification"`，提供精準追問清單
+        if "metadata" in data and data["metadata"] is None:
+            data["metadata"] = {}
 
-#### 6. ✅ 品質合格
-**觸發條件**:
-- `confidence ≥ 0.7` 且有可信來源支持
-- 草稿內容完整、準確、符合韓世翔語氣
+        if "confidence" in data and not isinstance(data["confidence"], (int, float)):
+            try:
+                data["confidence"] = float(data["confidence"])
+            except (ValueError, TypeError):
+                data["confidence"] = 0.5
 
-**處理方式**: `status = "ok"`，可能需要語氣潤飾
+        return data
 
-#### 7. ✏️ 需要編輯
-**觸發條件**:
-- 內容基本正確但語氣不自然
-- 小幅調整即可達到發布標準
 
-**處理方式**: `status = "needs_edit"`，提供具體修改建議
+class _SchemaLikeWrapper(BaseModel):
+    """某些模型會回 schema-like 結構，實際內容放在 example 欄位"""
 
-#### 8. 🆘 其他情況
-**處理方式**: 傾向 `status = "escalate_to_human"`，確保品質
+    model_config = ConfigDict(extra="ignore")
 
-## 📝 品質評估標準
+    example: EvaluateOutput
 
-### 🎯 內容品質檢核
-1. **事實準確性**: 基於檢索結果，不可虛構
-2. **來源覆蓋度**: 至少1個可信來源支持主要論點
-3. **資訊一致性**: 來源間無矛盾，邏輯清晰
-4. **專業深度**: 技術問題展現適當專業知識
-5. **實用價值**: 對招募方/合作夥伴有參考價值
 
-### 🎨 語氣風格評估
-1. **自然流暢**: 如真人對話般自然
-2. **個性一致**: 符合韓世翔的專業形象
-3. **適度親切**: 專業中帶有溫度
-4. **用詞精準**: 技術用詞準確，表達清晰
+class PartialEvaluation(BaseModel):
+    """串流評估過程中的部分結果（目前已生成的 final_answer）"""
 
-### 🎚️ 信心度調整原則
-- **聯絡資訊**: 固定 `confidence = 1.0`
-- **精確匹配**: `confidence ∈ [0.8, 1.0]`
-- **部分匹配**: `confidence ∈ [0.5, 0.8]`
-- **相關但不確定**: `confidence ∈ [0.2, 0.5]`
-- **不相關/錯誤**: `confidence ∈ [0.0, 0.2]`
+    final_answer: str
 
-## 📤 輸出格式規範
 
-### 🔧 JSON 結構 (僅限以下5個欄位)
-```json
-{
-  "final_answer": "第一人稱自然回答",
-  "sources": ["document_id_1", "document_id_2"],
-  "confidence": 0.85,
-  "status": "ok|needs_edit|needs_clarification|out_of_scope|escalate_to_human",
-  "metadata": {
-    "reason": "決策原因說明",
-    "missing_fields": ["缺少的關鍵資訊"],
-    "original_question": "原始問題",
-    "analysis_confidence": 0.75
-  }
+# 從尚未完成的 JSON 輸出中擷取 final_answer 字串內容
+_PARTIAL_FINAL_ANSWER = re.compile(r'"final_answer"\s*:\s*"((?:[^"\\]|\\.)*)')
+_INCOMPLETE_UNICODE_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{0,3}$")
+
+
+def _partial_final_answer(text: str) -> str:
+    """擷取串流中目前已生成的 final_answer；尚未出現時回傳空字串"""
+    match = _PARTIAL_FINAL_ANSWER.search(text)
+    if not match:
+        return ""
+    raw = _INCOMPLETE_UNICODE_ESCAPE.sub("", match.group(1))
+    # 結尾若是未完成的跳脫字元，先捨去
+    if (len(raw) - len(raw.rstrip("\\"))) % 2:
+        raw = raw[:-1]
+    try:
+        return json.loads(f'"{raw}"')
+    except ValueError:
+        return raw
+
+
+def _text_delta(event: Any) -> str:
+    """取出串流事件中的文字增量；非文字事件回傳空字串"""
+    if getattr(event, "type", None) != "raw_response_event":
+        return ""
+    data = getattr(event, "data", None)
+    if getattr(data, "type", None) != "response.output_text.delta":
+        return ""
+    return getattr(data, "delta", "") or ""
+
+
+# 評估狀態字串 → AgentDecision（匯入時建立，執行時只需一次 dict 查詢）
+_STATUS_TO_DECISION: Dict[str, AgentDecision] = {
+    **{d.name.lower(): d for d in AgentDecision},
+    **{d.value: d for d in AgentDecision},
+    "ok": AgentDecision.RETRIEVE,  # 表示可直接使用
+    "out_of_scope": AgentDecision.OUT_OF_SCOPE,
+    "clarify": AgentDecision.ASK_CLARIFY,
+    "needs_clarification": AgentDecision.ASK_CLARIFY,
 }
-```
 
-### ⚠️ 嚴格限制
-- 僅輸出上述5個欄位，禁止其他內容
-- 禁止包含 schema 相關欄位
-- 禁止輸出額外說明文字
 
-## 🎭 回答範例
+class _RetrievalView(BaseModel):
+    """送給 reviewer 的檢索結果精簡視圖"""
 
-### ✅ 優質回答範例
+    model_config = ConfigDict(
+        extra="ignore", from_attributes=True, coerce_numbers_to_str=True
+    )
 
-**聯絡資訊查詢**:
-```
-問題: "如何與你聯絡？"
-回答: "你可以透過 sacahan@gmail.com 與我聯絡，我會盡快回復你的訊息。"
-status: "ok", confidence: 1.0
-```
+    doc_id: Optional[str] = Field(
+        default=None, validation_alias=AliasChoices("doc_id", "id")
+    )
+    score: Optional[float] = None
+    excerpt: Optional[str] = None
+    metadata: Dict[str, Any] = Field(default_factory=dict)
 
-**技術能力查詢**:
-```
-問題: "你在 AI 領域有什麼經驗？"
-回答: "我在 AI/ML 領域有超過5年的實務經驗，專精於機器學習模型開發和深度學習應用，曾主導多個成功的 AI 專案落地。"
-status: "ok", confidence: 0.9
-```
+    @field_validator("excerpt")
+    @classmethod
+    def _truncate_excerpt(cls, v: Optional[str]) -> str:
+        return (v or "")[:MAX_EXCERPT_CHARS]
 
-**需要澄清範例**:
-```
-問題: "你的專案經驗如何？"
-回答: "我想更具體地回答你的問題。你希望了解哪個領域的專案經驗呢？比如 AI/ML 專案、系統架構設計，還是團隊管理經驗？"
-status: "needs_clarification"
-```
 
-### 🆘 升級人工處理話術
-當 `status = "escalate_to_human"` 時，統一使用:
+_RETRIEVAL_LIST: TypeAdapter[List[_RetrievalView]] = TypeAdapter(List[_RetrievalView])
 
-```
-"由於目前可查到的資料無法保證答案正確性。是否同意我先記錄下問題，再由本人進行回覆？麻煩再提供聯絡方式（稱呼/Email/電話/Line）。"
-```
 
-## 🚀 使命提醒
-記住，你代表韓世翔的專業形象。每個回答都要:
-- 展現他的技術實力和解決問題的能力
-- 體現他的學習熱忱和團隊精神
-- 為用戶提供真正有價值的資訊
-- 維護親切專業的對話體驗
+@lru_cache(maxsize=1)
+def _agents_sdk():
+    """延遲載入 OpenAI Agents SDK
 
-讓每次互動都成為展現韓世翔優秀品質的機會！
-"""
+    SDK 會連帶載入 openai / httpx / anyio，匯入成本高；
+    只有實際建立代理或執行評估時才載入。
+    """
+    import agents
 
-# ---------- JSON-safe type
-JsonValue = Any
+    return agents
 
 
-# 寬容輸出模型（自動忽略 LLM 的額外欄位）
-class EvaluateOutput(BaseModel):
-    model_config = ConfigDict(
-        extra="ignore"
-    )  # ✅ 寬容：自動忽略 LLM 輸出的額外欄位（如 description）
+@lru_cache(maxsize=1)
+def _evaluate_output_schema() -> AgentOutputSchema:
+    """輸出 schema 只建立一次，所有 EvaluateAgent 共用"""
+    return _agents_sdk().AgentOutputSchema(EvaluateOutput, strict_json_schema=False)
 
-    final_answer: str
-    # 改為字串列表以符合 Analysis Agent 輸出格式
-    sources: List[str] = Field(default_factory=list)
-    confidence: float = Field(ge=0.0, le=1.0)
-    status: Literal[
-        "ok",
-        "needs_edit",
-        "needs_clarification",
-        "out_of_scope",
-        "escalate_to_human",
+
+# 驗證器只在匯入時建立一次，所有 EvaluateAgent 共用
+# 手動解析備援：一次驗證同時涵蓋正常輸出與 schema-like（example）包裝；
+# 由左至右比對，與原本「有 example 就優先採用」的行為一致
+_EVALUATE_RESPONSE = TypeAdapter(
+    Annotated[
+        Union[_SchemaLikeWrapper, EvaluateOutput], Field(union_mode="left_to_right")
     ]
-    metadata: Dict[str, JsonValue] = Field(default_factory=dict)
+)
+
+
+# 各模式 instructions 的摘要，作為評估結果快取鍵的一部分
+_INSTRUCTIONS_DIGESTS: Dict[str, str] = {
+    mode: hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+    for mode, text in _FULL_INSTRUCTIONS.items()
+}
+
+
+@lru_cache(maxsize=1)
+def _default_model_settings() -> ModelSettings:
+    """模型設定不隨請求變動，整個程序共用"""
+    return _agents_sdk().ModelSettings(include_usage=True)
+
+
+def _proxy_config() -> Tuple[str, str, str]:
+    """讀取 LiteLLM Proxy 設定
+
+    Returns:
+        Tuple[str, str, str]: (api_key, api_base, proxy_model)
+
+    Raises:
+        ValueError: 未設定 LITELLM_PROXY_API_KEY 或 LITELLM_PROXY_API_BASE
+    """
+    api_key = os.getenv("LITELLM_PROXY_API_KEY")
+    api_base = os.getenv("LITELLM_PROXY_API_BASE")
+    proxy_model = os.getenv("LITELLM_PROXY_MODEL", "gpt-4o")
+
+    if not api_key or not api_base:
+        logger.error("❌ 未設定 LITELLM_PROXY 相關環境變數")
+        raise ValueError(
+            "LITELLM_PROXY_API_KEY and LITELLM_PROXY_API_BASE are required"
+        )
+    return api_key, api_base, proxy_model
+
+
+@loop_bound_cache
+def _openai_client(api_base: str, api_key: str):
+    """建立（並快取）指向 LiteLLM Proxy 的 AsyncOpenAI client
+
+    同一個 event loop 內所有 EvaluateAgent 與離線批次共用同一個 client 與
+    httpx 連線池，避免重複 TLS 交握；loop 改變時重建。
+    """
+    import httpx
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=30.0,
+    )
+    return AsyncOpenAI(base_url=api_base, api_key=api_key, http_client=http_client)
+
+
+@loop_bound_cache
+def _build_chat_model(proxy_model: str, api_base: str, api_key: str):
+    """建立（並快取）指向 LiteLLM Proxy 的模型實例"""
+    from agents.models.openai_chatcompletions import OpenAIChatCompletionsModel
+
+    # 使用 OpenAIChatCompletionsModel（相容非 OpenAI 後端）
+    return OpenAIChatCompletionsModel(
+        model=proxy_model, openai_client=_openai_client(api_base, api_key)
+    )
+
+
+@loop_bound_cache
+def _get_shared_agent(
+    proxy_model: str, api_base: str, api_key: str, response_length: str
+) -> Agent:
+    """建立（並快取）品質評估 Agent
+
+    相同 (model, api_base, api_key, response_length) 的 EvaluateAgent 在同一個
+    event loop 內共用同一個 Agent、模型 client 與輸出 schema。
+    """
+    sdk = _agents_sdk()
+
+    # 建立基礎 ModelSettings
+    base_settings = sdk.ModelSettings(
+        max_completion_tokens=600,  # 適度控制回答長度
+    )
+
+    # 系統提示在程序生命週期內固定不變，OpenAI 會自動套用前綴快取；
+    # Anthropic 等需明確標記的供應商則交由 LiteLLM 注入 cache_control
+    if os.getenv("LITELLM_PROMPT_CACHE_INJECTION", "").lower() in (
+        "1",
+        "true",
+        "yes",
+    ):
+        base_settings.extra_body = {
+            "cache_control_injection_points": [
+                {"location": "message", "role": "system"}
+            ]
+        }
+
+    # 🔍 品質評估代理進階設定
+    # - 嚴格輸出格式確保一致性
+    # - 適度 token 限制維持回答品質
+    return sdk.Agent(
+        name="韓世翔品質評估助理",
+        instructions=_FULL_INSTRUCTIONS[response_length],
+        model=_build_chat_model(proxy_model, api_base, api_key),
+        model_settings=base_settings,
+        output_type=_evaluate_output_schema(),
+    )
 
 
 class EvaluateAgent:
@@ -230,109 +471,100 @@ class EvaluateAgent:
         # 建立 LiteLLM 模型
         self.llm_model, self.llm_settings = self._create_litellm_model_and_settings()
         self.response_length = os.environ.get("AGENT_RESPONSE_LENGTH", "normal")
+        self.model_name = os.getenv("LITELLM_PROXY_MODEL", "gpt-4o")
         self.sdk_agent: Optional[Agent] = None
+        self._agent_key: Optional[Tuple[str, str, str, str]] = None
+        self._instructions_digest = ""
 
         self._initialize_sdk_agent()
 
+        # 評估結果快取：相同分析內容直接回傳先前的評估，省去整輪 LLM 呼叫
+        self._response_cache = TTLCache(
+            maxsize=int(os.getenv("EVAL_CACHE_SIZE", "2000")),
+            ttl_seconds=float(os.getenv("EVAL_CACHE_TTL", "3600")),
+        )
+
+        # 語意評估快取：問題 + 草稿語意相近（同問題類型）時沿用先前的 LLM 評估
+        self._enable_semantic_cache = os.getenv(
+            "EVAL_SEMANTIC_CACHE", "true"
+        ).lower() in ("1", "true", "yes")
+        self._semantic_cache = SemanticCache(
+            threshold=float(os.getenv("EVAL_SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            maxsize=int(os.getenv("EVAL_CACHE_SIZE", "2000")),
+            ttl_seconds=float(os.getenv("EVAL_CACHE_TTL", "3600")),
+        )
+
+        # 升級人工處理的語意負向快取：LLM 判定需升級的問題，相近問法直接回覆範本
+        self._enable_escalate_cache = os.getenv(
+            "EVAL_ESCALATE_CACHE", "true"
+        ).lower() in ("1", "true", "yes")
+        self._escalate_cache = SemanticCache(
+            threshold=float(os.getenv("EVAL_ESCALATE_CACHE_THRESHOLD", "0.92")),
+            maxsize=1024,
+            ttl_seconds=float(os.getenv("EVAL_CACHE_TTL", "3600")),
+        )
+
+        # 規則式快速路徑（預設關閉）：超出範圍與高信心度且來源充足的分析不呼叫 LLM
+        self._enable_rule_fast_path = os.getenv(
+            "EVAL_FAST_PATH", "false"
+        ).lower() in ("1", "true", "yes")
+
     def _create_litellm_model_and_settings(self):
-        """創建 OpenAI 模型實例和 ModelSettings
+        """取得 OpenAI 模型實例和 ModelSettings
 
         Returns:
             Tuple[OpenAIChatCompletionsModel, ModelSettings]: (模型實例, 設置)
 
         Note:
             使用 OpenAI SDK 直接連接 LiteLLM Proxy，避免 LiteLLM 內部的認證邏輯。
+            相同設定的模型在程序內共用，不會重複建立 client。
         """
-        from openai import AsyncOpenAI
-        from agents.models.openai_chatcompletions import OpenAIChatCompletionsModel
-
-        # 使用 LiteLLM Proxy 配置
-        api_key = os.getenv("LITELLM_PROXY_API_KEY")
-        api_base = os.getenv("LITELLM_PROXY_API_BASE")
-        proxy_model = os.getenv("LITELLM_PROXY_MODEL", "gpt-4o")
-
-        if not api_key or not api_base:
-            logger.error("❌ 未設定 LITELLM_PROXY 相關環境變數")
-            raise ValueError(
-                "LITELLM_PROXY_API_KEY and LITELLM_PROXY_API_BASE are required"
-            )
-
-        logger.info(f"📡 使用 LiteLLM Proxy: {api_base}")
-        logger.info(f"📡 Proxy Model: {proxy_model}")
+        api_key, api_base, proxy_model = _proxy_config()
 
-        # 建立 AsyncOpenAI client 指向 LiteLLM Proxy
-        client = AsyncOpenAI(
-            base_url=api_base,
-            api_key=api_key,
-        )
-
-        # 使用 OpenAIChatCompletionsModel（相容非 OpenAI 後端）
-        llm_model = OpenAIChatCompletionsModel(
-            model=proxy_model,
-            openai_client=client,
-        )
+        logger.info("📡 使用 LiteLLM Proxy: %s", api_base)
+        logger.info("📡 Proxy Model: %s", proxy_model)
 
-        model_settings = ModelSettings(include_usage=True)
+        llm_model = _build_chat_model(proxy_model, api_base, api_key)
 
-        logger.info(f"✅ OpenAI 模型已建立: {proxy_model}")
-        return llm_model, model_settings
+        logger.info("✅ OpenAI 模型已建立: %s", proxy_model)
+        return llm_model, _default_model_settings()
 
     def _initialize_sdk_agent(self):
-        """初始化 Evaluate Agent"""
+        """初始化 Evaluate Agent（相同設定的 Agent 在程序內共用）"""
         try:
-            # 根據回覆長度設定調整 instructions
-            response_instructions = self._get_response_length_instructions()
-            full_instructions = DEFAULT_INSTRUCTIONS + "\n\n" + response_instructions
+            mode = self._response_length_mode()
+            # instructions 變動時快取鍵隨之改變，避免沿用舊提示詞的評估結果
+            self._instructions_digest = _INSTRUCTIONS_DIGESTS[mode]
 
-            # 建立基礎 ModelSettings
-            base_settings = ModelSettings(
-                max_completion_tokens=600,  # 適度控制回答長度
-            )
-
-            # 合併 GitHub Copilot 的 extra_headers
-            if self.llm_settings and self.llm_settings.extra_headers:
-                base_settings.extra_headers = {
-                    **(base_settings.extra_headers or {}),
-                    **self.llm_settings.extra_headers,
-                }
-
-            # 🔍 品質評估代理進階設定
-            # - 嚴格輸出格式確保一致性
-            # - 低溫度參數提升決策穩定性
-            # - 適度 token 限制維持回答品質
-            self.sdk_agent = Agent(
-                name="韓世翔品質評估助理",
-                instructions=full_instructions,
-                model=self.llm_model,
-                model_settings=base_settings,
-                output_type=AgentOutputSchema(EvaluateOutput, strict_json_schema=False),
-            )
+            api_key, api_base, proxy_model = _proxy_config()
+            self._agent_key = (proxy_model, api_base, api_key, mode)
+            self.sdk_agent = _get_shared_agent(*self._agent_key)
             logger.info("🔍 韓世翔品質評估助理初始化成功")
             logger.info("✅ 已啟用智慧品質控制與決策穩定機制")
 
         except Exception as e:
-            logger.error(f"初始化 Evaluate Agent 失敗: {e}")
+            logger.error("初始化 Evaluate Agent 失敗: %s", e)
+
+    def _sdk_agent_for_running_loop(self) -> Optional[Agent]:
+        """取得綁定目前 event loop 的共用 Agent（loop 改變時重建模型 client）"""
+        if self._agent_key is not None:
+            self.sdk_agent = _get_shared_agent(*self._agent_key)
+        return self.sdk_agent
+
+    def _response_length_mode(self) -> str:
+        """正規化 AGENT_RESPONSE_LENGTH，未知值回退為 normal"""
+        mode = self.response_length.lower()
+        return mode if mode in _FULL_INSTRUCTIONS else "normal"
 
     def _get_response_length_instructions(self) -> str:
         """根據環境變數設定回傳回覆長度控制指令"""
-        if self.response_length.lower() == "brief":
-            return """## 📏 回覆長度控制 - 簡潔模式
-- **目標長度**: 1-2句話，直擊核心
-- **內容策略**: 僅保留最關鍵資訊，去除背景描述
-- **語氣調整**: 保持親切但更加直接明確
-- **適用場景**: 快速問答、基礎資訊確認"""
-        elif self.response_length.lower() == "detailed":
-            return """## 📏 回覆長度控制 - 詳細模式
-- **目標長度**: 3-5段落，提供完整脈絡
-- **內容策略**: 包含背景資訊、具體案例、實務經驗分享
-- **語氣調整**: 專業深入，展現技術思維與解決問題的過程
-- **適用場景**: 技術深度問題、專案經驗分享、複雜概念解釋"""
-        else:  # normal
-            return """## 📏 回覆長度控制 - 標準模式
-- **目標長度**: 2-4句話，平衡簡潔與完整性
-- **內容策略**: 核心資訊 + 適度背景，保持資訊密度
-- **語氣調整**: 自然對話，專業而親切
-- **適用場景**: 一般履歷問題、技能經驗查詢、日常互動"""
+        return _LENGTH_TEMPLATES.get(
+            self.response_length.lower(), _LENGTH_TEMPLATES["normal"]
+        )
+
+    def _get_full_instructions(self) -> str:
+        """回傳預先組合並 intern 的完整 instructions"""
+        return _FULL_INSTRUCTIONS[self._response_length_mode()]
 
     # -------------------------
     # 安全解析：即使模型回 schema/雜訊也能修復
@@ -340,72 +572,430 @@ class EvaluateAgent:
     def _safe_parse_output(self, result) -> Optional[EvaluateOutput]:
         """盡力把 SDK 輸出轉成 EvaluateOutput；失敗則回 None
 
-        由於使用 extra="ignore"，Pydantic 會自動忽略額外欄位（如 description），
-        所以無需手動清洗 schema 相關欄位。
+        格式修正由 EvaluateOutput 的 before validator 處理；由於使用
+        extra="ignore"，額外欄位（如 description）也會被自動忽略。
         """
-        try:
-            # 嘗試 SDK 的 final_output_as
-            return result.final_output_as(EvaluateOutput)
-        except Exception as e:
-            logger.warning(f"final_output_as 失敗，嘗試手動解析：{e}")
+        # 常見情況：SDK 已依 output_type 產生 EvaluateOutput，型別檢查即可，
+        # 不經過 final_output_as 的例外流程
+        final_output = getattr(result, "final_output", None)
+        if isinstance(final_output, EvaluateOutput):
+            return final_output
+        if isinstance(final_output, dict):
+            parsed = self._parse_raw_output(final_output)
+            if parsed is not None:
+                return parsed
 
         # 備用方案：手動解析 result.output
-        raw = getattr(result, "output", None)
+        return self._parse_raw_output(getattr(result, "output", None))
+
+    @staticmethod
+    def _parse_raw_output(raw: Any) -> Optional[EvaluateOutput]:
+        """解析 JSON 字串或 dict 形式的原始輸出；失敗則回 None"""
         if raw is None:
             logger.error("無法取得 result.output")
             return None
 
         try:
-            if isinstance(raw, str):
-                data = json.loads(raw)
+            if isinstance(raw, (str, bytes)):
+                parsed = _EVALUATE_RESPONSE.validate_json(raw)
             elif isinstance(raw, dict):
-                data = raw
+                parsed = _EVALUATE_RESPONSE.validate_python(raw)
             else:
-                logger.error(f"未知輸出型別：{type(raw)}")
+                logger.error("未知輸出型別：%s", type(raw))
                 return None
+            return parsed.example if isinstance(parsed, _SchemaLikeWrapper) else parsed
+        except Exception as e:
+            logger.error("手動解析輸出失敗：%s", e)
+            return None
 
-            # 某些模型會回 schema-like 結構，嘗試從 example 補值
-            if "example" in data and isinstance(data["example"], dict):
-                data = data["example"]
+    async def evaluate(self, analysis: AnalysisResult) -> EvaluationResult:
+        """評估分析結果並生成最終回答"""
+        logger.info("開始評估分析結果")
 
-            # 修正常見的格式錯誤
-            if "sources" in data and not isinstance(data["sources"], list):
-                data["sources"] = (
-                    [data["sources"]] if isinstance(data["sources"], str) else []
-                )
+        # 確定性分支（聯絡資訊、低信心度等）不呼叫 LLM，也不寫入任何快取，
+        # 先行判斷，避免為它們查快取或計算嵌入向量
+        try:
+            fast_result, input_text = self._prepare_review(analysis)
+        except Exception as e:
+            logger.error("評估過程中發生錯誤: %s", e)
+            return self._error_result(e)
+        if fast_result is not None:
+            return fast_result
+
+        cache_key = self._response_cache_key(input_text)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("✨ 評估結果快取命中")
+            return cached.model_copy(deep=True)
+
+        semantic_vector = await self._semantic_cache_vector(analysis)
+        semantic_partition = getattr(
+            analysis.question_type, "value", analysis.question_type
+        )
+        if semantic_vector is not None:
+            similar = self._semantic_cache.get(
+                semantic_vector, partition=semantic_partition
+            )
+            if similar is not None:
+                logger.info("🧠 語意評估快取命中")
+                result = similar.model_copy(deep=True)
+                result.metadata["cache"] = "semantic_hit"
+                result.metadata["original_question"] = analysis.query
+                result.metadata["analysis_confidence"] = analysis.confidence
+                return result
+
+        query_vector = await self._escalate_cache_vector(analysis)
+        if query_vector is not None:
+            escalated = self._escalate_cache.get(query_vector)
+            if escalated is not None:
+                logger.info("🧠 相近問題先前已升級人工處理，直接回覆範本")
+                result = escalated.model_copy(deep=True)
+                result.metadata["original_question"] = analysis.query
+                result.metadata["analysis_confidence"] = analysis.confidence
+                return result
+
+        try:
+            evaluation = await self._evaluate_with_sdk(analysis, input_text)
+        except Exception as e:
+            logger.error("評估過程中發生錯誤: %s", e)
+            return self._error_result(e)
+
+        # 只快取成功的評估結果
+        if not evaluation.metadata.get("error"):
+            self._response_cache.set(cache_key, evaluation.model_copy(deep=True))
+
+        # 語意快取只保存 LLM 的評估；確定性分支取決於分析信心度，不適合跨問題沿用
+        if (
+            semantic_vector is not None
+            and evaluation.metadata.get("sdk_result") is True
+            and not evaluation.metadata.get("error")
+        ):
+            self._semantic_cache.set(
+                semantic_vector,
+                evaluation.model_copy(deep=True),
+                partition=semantic_partition,
+            )
 
-            if "metadata" in data and data["metadata"] is None:
-                data["metadata"] = {}
+        # 只記錄 LLM 判定的升級（確定性分支取決於分析信心度，而非問題本身）
+        if (
+            query_vector is not None
+            and evaluation.status == AgentDecision.ESCALATE_TO_HUMAN
+            and evaluation.metadata.get("sdk_result") is True
+        ):
+            self._escalate_cache.set(
+                query_vector,
+                EvaluationResult(
+                    final_answer=ESCALATE_MESSAGE,
+                    sources=[],
+                    confidence=evaluation.confidence,
+                    status=AgentDecision.ESCALATE_TO_HUMAN,
+                    metadata={"sdk_result": False, "fast_path": "escalate_cache"},
+                ),
+            )
+        return evaluation
 
-            if "confidence" in data and not isinstance(
-                data["confidence"], (int, float)
-            ):
-                try:
-                    data["confidence"] = float(data["confidence"])
-                except (ValueError, TypeError):
-                    data["confidence"] = 0.5
+    async def _semantic_cache_vector(self, analysis: AnalysisResult) -> Optional[Any]:
+        """取得語意評估快取使用的「問題 + 草稿」向量；停用或無法取得時回傳 None"""
+        if not self._enable_semantic_cache or not analysis.draft_answer:
+            return None
+        return await self._embed_text(f"{analysis.query}\n{analysis.draft_answer}")
+
+    async def _escalate_cache_vector(self, analysis: AnalysisResult) -> Optional[Any]:
+        """取得升級負向快取使用的問題向量；停用或無法取得時回傳 None"""
+        if not self._enable_escalate_cache or not analysis.query:
+            return None
+        # Analysis Agent 檢索時通常已對同一查詢編碼過，優先沿用嵌入快取
+        cached = self._cached_query_embedding(analysis.query)
+        if cached is not None:
+            return cached
+        return await self._embed_text(analysis.query)
+
+    @staticmethod
+    def _cached_query_embedding(query: str) -> Optional[Any]:
+        """從共用 RAGTools 的嵌入快取取得查詢向量（不執行 encode）"""
+        try:
+            from backend.tools.rag import get_default_rag_tools
 
-            # 由於 extra="ignore"，額外欄位會被自動忽略
-            return EvaluateOutput.model_validate(data)
+            return get_default_rag_tools().cached_query_embedding(query)
         except Exception as e:
-            logger.error(f"手動解析輸出失敗：{e}")
+            logger.debug("讀取查詢嵌入快取失敗：%s", e)
             return None
 
-    async def evaluate(self, analysis: AnalysisResult) -> EvaluationResult:
-        """評估分析結果並生成最終回答"""
-        logger.info("開始評估分析結果")
+    @staticmethod
+    async def _embed_text(text: str) -> Optional[Any]:
+        """以共用 RAGTools 的嵌入模型（含嵌入快取）取得向量；失敗時回傳 None"""
+        try:
+            from backend.tools.rag import get_default_rag_tools
+
+            rag_tools = get_default_rag_tools()
+            return await asyncio.to_thread(rag_tools.embed_query, text)
+        except Exception as e:
+            logger.warning("取得嵌入向量失敗，略過語意快取：%s", e)
+            return None
+
+    async def evaluate_streamed(
+        self, analysis: AnalysisResult
+    ) -> AsyncIterator[PartialEvaluation | EvaluationResult]:
+        """串流評估分析結果
 
+        生成過程中每隔 EVAL_STREAM_FLUSH_S（預設 0.05 秒）送出一次目前的
+        final_answer（PartialEvaluation），最後送出完整的 EvaluationResult。
+        命中快取或確定性分支時只會送出一次完整結果。
+        """
         try:
-            return await self._evaluate_with_sdk(analysis)
+            fast_result, input_text = self._prepare_review(analysis)
         except Exception as e:
-            logger.error(f"評估過程中發生錯誤: {e}")
-            return EvaluationResult(
-                final_answer="抱歉，系統處理您的問題時發生錯誤，請稍後再試。",
-                sources=[],
-                confidence=0.0,
-                status=self._fallback_status(),
-                metadata={"error": str(e)},
+            logger.error("評估過程中發生錯誤: %s", e)
+            yield self._error_result(e)
+            return
+        if fast_result is not None:
+            yield fast_result
+            return
+
+        cache_key = self._response_cache_key(input_text)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            yield cached.model_copy(deep=True)
+            return
+
+        loop = asyncio.get_running_loop()
+        timeout = float(os.getenv("EVAL_TIMEOUT_S", "15"))
+        flush_interval = float(os.getenv("EVAL_STREAM_FLUSH_S", "0.05"))
+        deadline = loop.time() + timeout
+        last_flush = loop.time()
+        last_answer = ""
+        chunks: List[str] = []
+        streamed = None
+
+        try:
+            streamed = _agents_sdk().Runner.run_streamed(
+                self._sdk_agent_for_running_loop(), input=input_text
             )
+            events = streamed.stream_events().__aiter__()
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                try:
+                    event = await asyncio.wait_for(events.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+
+                delta = _text_delta(event)
+                if not delta:
+                    continue
+                chunks.append(delta)
+
+                # 批次送出，避免每個 token 都觸發下游處理
+                now = loop.time()
+                if now - last_flush < flush_interval:
+                    continue
+                last_flush = now
+                answer = _partial_final_answer("".join(chunks))
+                if answer and answer != last_answer:
+                    last_answer = answer
+                    yield PartialEvaluation(final_answer=answer)
+        except asyncio.TimeoutError:
+            logger.error("Evaluate Agent 逾時（%ss），回傳安全預設值", timeout)
+            if streamed is not None:
+                streamed.cancel()
+            yield self._sdk_error_result("timeout")
+            return
+        except Exception as e:
+            logger.error("執行 Evaluate Agent 時發生錯誤: %s", e)
+            yield self._sdk_error_result(str(e))
+            return
+
+        evaluation = self._build_evaluation(streamed, analysis)
+        if not evaluation.metadata.get("error"):
+            self._response_cache.set(cache_key, evaluation.model_copy(deep=True))
+        yield evaluation
+
+    async def evaluate_batch(
+        self, analyses: List[AnalysisResult], max_concurrency: int | None = None
+    ) -> List[EvaluationResult]:
+        """並行評估多個分析結果，結果順序與輸入一致
+
+        Args:
+            analyses: 分析結果列表
+            max_concurrency: 同時進行的 LLM 請求上限，預設讀取
+                EVAL_MAX_CONCURRENCY（8），避免超過 Proxy 速率限制
+
+        Returns:
+            List[EvaluationResult]: 評估結果；個別失敗時回傳與 evaluate 相同的預設值
+        """
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("EVAL_MAX_CONCURRENCY", "8"))
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _bounded(analysis: AnalysisResult) -> EvaluationResult:
+            async with semaphore:
+                return await self.evaluate(analysis)
+
+        results = await asyncio.gather(
+            *(_bounded(a) for a in analyses), return_exceptions=True
+        )
+        return [
+            self._error_result(r) if isinstance(r, BaseException) else r
+            for r in results
+        ]
+
+    async def evaluate_batch_offline(
+        self,
+        analyses: List[AnalysisResult],
+        output_dir: str | os.PathLike | None = None,
+    ) -> List[EvaluationResult]:
+        """以 OpenAI Batch API 離線評估多個分析結果，結果順序與輸入一致
+
+        將需要 LLM 的評估寫成 JSONL 一次送出（24 小時內完成、費用約為即時
+        呼叫的一半），輪詢至批次結束後解析輸出；確定性分支不送出，直接回傳。
+
+        Args:
+            analyses: 分析結果列表
+            output_dir: 請求 / 回應 JSONL 的存放目錄，預設讀取
+                EVALUATE_BATCH_DIR（./cache/eval_batches）
+
+        Returns:
+            List[EvaluationResult]: 評估結果；個別失敗時回傳安全預設值
+        """
+        results: List[Optional[EvaluationResult]] = [None] * len(analyses)
+        pending: Dict[str, int] = {}
+        lines: List[str] = []
+        instructions = self._get_full_instructions()
+
+        for index, analysis in enumerate(analyses):
+            try:
+                fast_result, input_text = self._prepare_review(analysis)
+            except Exception as e:
+                logger.error("準備離線評估輸入失敗: %s", e)
+                results[index] = self._error_result(e)
+                continue
+            if fast_result is not None:
+                results[index] = fast_result
+                continue
+
+            custom_id = uuid.uuid4().hex
+            pending[custom_id] = index
+            request = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model_name,
+                    "messages": [
+                        {"role": "system", "content": instructions},
+                        {"role": "user", "content": input_text},
+                    ],
+                    "max_completion_tokens": 600,
+                    "response_format": {"type": "json_object"},
+                },
+            }
+            lines.append(_dumps(request))
+
+        if pending:
+            try:
+                outputs = await self._run_offline_batch(lines, output_dir)
+            except Exception as e:
+                logger.error("離線批次評估失敗: %s", e)
+                outputs = {}
+
+            for custom_id, index in pending.items():
+                results[index] = self._offline_evaluation(
+                    outputs.get(custom_id), analyses[index]
+                )
+
+        return [r for r in results if r is not None]
+
+    async def _run_offline_batch(
+        self, lines: List[str], output_dir: str | os.PathLike | None
+    ) -> Dict[str, Dict[str, Any]]:
+        """上傳 JSONL、建立批次並輪詢至結束，回傳 custom_id → 回應紀錄"""
+        api_key, api_base, _ = _proxy_config()
+        client = _openai_client(api_base, api_key)
+
+        directory = Path(
+            output_dir or os.getenv("EVALUATE_BATCH_DIR", "./cache/eval_batches")
+        )
+        directory.mkdir(parents=True, exist_ok=True)
+        input_path = directory / f"evaluate_{time.strftime('%Y%m%d_%H%M%S')}.jsonl"
+        input_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        with input_path.open("rb") as f:
+            uploaded = await client.files.create(file=f, purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        logger.info("📦 已送出離線評估批次 %s（%d 筆）", batch.id, len(lines))
+
+        # 指數退避輪詢，避免長時間批次造成大量無效請求
+        delay = float(os.getenv("EVALUATE_BATCH_POLL_S", "10"))
+        max_delay = float(os.getenv("EVALUATE_BATCH_POLL_MAX_S", "300"))
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+            batch = await client.batches.retrieve(batch.id)
+            logger.debug("離線評估批次 %s 狀態: %s", batch.id, batch.status)
+
+        if not batch.output_file_id:
+            raise RuntimeError(f"batch {batch.id} ended with status {batch.status}")
+
+        content = await client.files.content(batch.output_file_id)
+        output_path = directory / f"{batch.id}_output.jsonl"
+        output_path.write_text(content.text, encoding="utf-8")
+        logger.info("✅ 離線評估批次 %s 完成，輸出: %s", batch.id, output_path)
+
+        outputs: Dict[str, Dict[str, Any]] = {}
+        for line in content.text.splitlines():
+            if line.strip():
+                record = json.loads(line)
+                outputs[record.get("custom_id", "")] = record
+        return outputs
+
+    def _offline_evaluation(
+        self, record: Optional[Dict[str, Any]], analysis: AnalysisResult
+    ) -> EvaluationResult:
+        """將 Batch API 的單筆回應轉為 EvaluationResult"""
+        if record is None:
+            return self._sdk_error_result("batch_result_missing")
+
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or response.get("body", {}).get("error")
+            return self._sdk_error_result(f"batch_request_failed: {error}")
+
+        try:
+            content = response["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            content = None
+        return self._evaluation_from_output(
+            self._parse_raw_output(content), analysis, content
+        )
+
+    def _error_result(self, error: BaseException) -> EvaluationResult:
+        """評估失敗時的安全預設值"""
+        return EvaluationResult(
+            final_answer="抱歉，系統處理您的問題時發生錯誤，請稍後再試。",
+            sources=[],
+            confidence=0.0,
+            status=self._fallback_status(),
+            metadata={"error": str(error)},
+        )
+
+    def _response_cache_key(self, input_text: str) -> str:
+        """以送給 reviewer 的正規化輸入建立快取鍵
+
+        input_text 由 _prepare_review 以固定順序序列化，涵蓋問題、草稿、
+        信心度、檢索摘錄與分數；再加上模型、回答長度與 instructions 版本。
+        """
+        payload = "\x1f".join(
+            (self.model_name, self.response_length, self._instructions_digest)
+        )
+        digest = hashlib.blake2b(
+            f"{payload}\x1f{input_text}".encode("utf-8"), digest_size=16
+        )
+        return digest.hexdigest()
 
     def _fallback_status(self) -> AgentDecision:
         # 優先使用 OUT_OF_SCOPE，否則回傳 enum 第一個值
@@ -420,126 +1010,231 @@ class EvaluateAgent:
     def _map_status_to_agent_decision(self, status_str: str) -> AgentDecision:
         """將輸出狀態字串穩健映射到 AgentDecision"""
         s = (status_str or "").strip().lower().replace("-", "_").replace(" ", "_")
-        name_map = {
-            "oos": "OUT_OF_SCOPE",
-            "out_of_scope": "OUT_OF_SCOPE",
-            "clarify": "CLARIFY",
-            "needs_clarification": "CLARIFY",  # 若有 NEEDS_CLARIFICATION 也會在下方候選命中
-            "ok": "RETRIEVE",  # 表示可直接使用；若有 OK 也會試圖命名匹配
-            "needs_edit": "NEEDS_EDIT",
-            "escalate_to_human": "ESCALATE_TO_HUMAN",
-            "retrieve": "RETRIEVE",
+        return _STATUS_TO_DECISION.get(s) or self._fallback_status()
+
+    @staticmethod
+    def _source_support(retrievals: List[Any]) -> float:
+        """來源支持度：前 5 筆檢索分數平均，筆數不足 3 筆時依比例折減"""
+        scores = [float(getattr(r, "score", 0.0) or 0.0) for r in retrievals[:5]]
+        if not scores:
+            return 0.0
+        return sum(scores) / len(scores) * min(1.0, len(scores) / 3)
+
+    @staticmethod
+    def _fast_path_result(
+        analysis: AnalysisResult,
+        used_contact_info_tool: bool,
+        sources: List[Any],
+        rule_based: bool = False,
+    ) -> Optional[EvaluationResult]:
+        """決策流程中的確定性分支，命中時不呼叫 LLM
+
+        1. 聯絡資訊查詢且已有草稿 → 直接通過（與提示詞 [A] 一致：信心度 1.0）
+        2. 信心度過低或沒有來源 → 升級人工處理（超出範圍的問題仍交由 LLM 婉拒）
+
+        rule_based（EVAL_FAST_PATH）開啟時另外：
+        3. 超出範圍 → 直接以統一話術婉拒
+        4. 信心度 >= 0.9 且來源支持度 >= 0.7 → 直接採用草稿
+        """
+        metadata: Dict[str, JsonValue] = {
+            "sdk_result": False,
+            "original_question": getattr(analysis, "query", ""),
+            "analysis_confidence": analysis.confidence,
         }
-        candidates = [
-            name_map.get(s),
-            s.upper(),
-        ]
-        # 也嘗試更常見名稱
-        candidates.extend(
-            [
-                "OK",
-                "NEEDS_EDIT",
-                "NEEDS_CLARIFICATION",
-                "OUT_OF_SCOPE",
-                "ESCALATE_TO_HUMAN",
-                "RETRIEVE",
-                "CLARIFY",
-            ]
-        )
-        for c in candidates:
-            if not c:
-                continue
-            if hasattr(AgentDecision, c):
-                return getattr(AgentDecision, c)
-            # 嘗試以 value 轉換
-            try:
-                return AgentDecision(c)  # type: ignore
-            except Exception:
-                pass
-        return self._fallback_status()
 
-    async def _evaluate_with_sdk(self, analysis: AnalysisResult) -> EvaluationResult:
-        """使用 OpenAI Agents SDK 評估分析結果"""
+        if used_contact_info_tool and analysis.draft_answer:
+            metadata["fast_path"] = "contact"
+            return EvaluationResult(
+                final_answer=analysis.draft_answer,
+                sources=[str(s) for s in sources],
+                confidence=1.0,
+                status=AgentDecision.RETRIEVE,
+                metadata=metadata,
+            )
+
+        if rule_based and analysis.decision == AgentDecision.OUT_OF_SCOPE:
+            metadata["fast_path"] = "out_of_scope"
+            return EvaluationResult(
+                final_answer=OUT_OF_SCOPE_MESSAGE,
+                sources=[],
+                confidence=analysis.confidence,
+                status=AgentDecision.OUT_OF_SCOPE,
+                metadata=metadata,
+            )
+
+        if analysis.decision != AgentDecision.OUT_OF_SCOPE and (
+            analysis.confidence < LOW_CONFIDENCE_THRESHOLD or not sources
+        ):
+            metadata["fast_path"] = "low_confidence"
+            return EvaluationResult(
+                final_answer=ESCALATE_MESSAGE,
+                sources=[str(s) for s in sources],
+                confidence=analysis.confidence,
+                status=AgentDecision.ESCALATE_TO_HUMAN,
+                metadata=metadata,
+            )
+
+        if (
+            rule_based
+            and analysis.draft_answer
+            and analysis.confidence >= HIGH_CONFIDENCE_THRESHOLD
+            and EvaluateAgent._source_support(analysis.retrievals or [])
+            >= SOURCE_SUPPORT_THRESHOLD
+        ):
+            metadata["fast_path"] = "high_confidence"
+            return EvaluationResult(
+                final_answer=analysis.draft_answer,
+                sources=[str(s) for s in sources],
+                confidence=analysis.confidence,
+                status=AgentDecision.RETRIEVE,
+                metadata=metadata,
+            )
+
+        return None
+
+    async def _evaluate_with_sdk(
+        self, analysis: AnalysisResult, input_text: Optional[str] = None
+    ) -> EvaluationResult:
+        """使用 OpenAI Agents SDK 評估分析結果
+
+        Args:
+            analysis: 分析結果
+            input_text: 已由 _prepare_review 準備好的 reviewer 輸入；
+                未提供時在此準備（並處理確定性分支）
+        """
+        if input_text is None:
+            fast_result, input_text = self._prepare_review(analysis)
+            if fast_result is not None:
+                return fast_result
+
+        # 執行 SDK Agent
+        timeout = float(os.getenv("EVAL_TIMEOUT_S", "15"))
+        try:
+            result = await asyncio.wait_for(
+                _agents_sdk().Runner.run(
+                    self._sdk_agent_for_running_loop(), input=input_text
+                ),
+                timeout=timeout,
+            )
+            # RunResult 的字串表示可能很大，只在 DEBUG 時才組字串
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Evaluate Agent 回覆: %s", result)
+        except asyncio.TimeoutError:
+            logger.error("Evaluate Agent 逾時（%ss），回傳安全預設值", timeout)
+            return self._sdk_error_result("timeout")
+        except Exception as e:
+            logger.error("執行 Evaluate Agent 時發生錯誤: %s", e)
+            return self._sdk_error_result(str(e))
+
+        return self._build_evaluation(result, analysis)
+
+    def _prepare_review(
+        self, analysis: AnalysisResult
+    ) -> Tuple[Optional[EvaluationResult], str]:
+        """準備 reviewer 輸入
+
+        Returns:
+            Tuple[Optional[EvaluationResult], str]: 命中確定性分支時回傳 (結果, "")，
+            否則回傳 (None, 送給 LLM 的 JSON 輸入)
+        """
         # 檢查是否使用了 get_contact_info 工具
-        used_contact_info_tool = False
-        if analysis.metadata and isinstance(analysis.metadata, dict):
-            # 多種方式檢查是否使用了聯絡資訊工具
-            # 1. 檢查 metadata 中的 source 欄位
-            if analysis.metadata.get("source") == "get_contact_info":
-                used_contact_info_tool = True
-            # 2. 檢查 raw_output 中是否包含工具調用
-            raw_output = analysis.metadata.get("raw_output")
-            if raw_output and isinstance(raw_output, str):
-                if "get_contact_info" in raw_output:
-                    used_contact_info_tool = True
-            # 3. 檢查問題類型是否為聯絡資訊
-            if (
-                getattr(analysis.question_type, "value", str(analysis.question_type))
-                == "contact"
-            ):
-                # 對於聯絡資訊類型的問題，如果信心度高，也視為使用了工具
-                if analysis.confidence > 0.8:
-                    used_contact_info_tool = True
+        # 以 Analysis Agent 的標記為準；另外相容 metadata.source 與高信心度聯絡問題
+        metadata = analysis.metadata if isinstance(analysis.metadata, dict) else {}
+        used_contact_info_tool = (
+            bool(metadata.get("used_contact_info_tool"))
+            or metadata.get("source") == "get_contact_info"
+            or (
+                getattr(analysis.question_type, "value", None) == "contact"
+                and analysis.confidence > 0.8
+            )
+        )
+
+        # 確定性分支不需要 LLM 判斷，直接回傳
+        meta_sources = (analysis.metadata or {}).get("sources", [])
+        if not isinstance(meta_sources, list):
+            meta_sources = []
+        fast_result = self._fast_path_result(
+            analysis, used_contact_info_tool, meta_sources, self._enable_rule_fast_path
+        )
+        if fast_result is not None:
+            return fast_result, ""
 
         # 準備 reviewer 輸入：原問題 + analysis 全量輸出
-        analysis_data = {
-            "original_question": getattr(analysis, "query", ""),
-            "analysis_output": {
-                "decision": getattr(analysis.decision, "value", str(analysis.decision)),
-                "question_type": getattr(
-                    analysis.question_type, "value", str(analysis.question_type)
-                ),
-                "confidence": analysis.confidence,
-                "draft_answer": analysis.draft_answer or "",
-                "metadata": analysis.metadata or {},
-                "retrievals": [],
-                "sources": [],  # 若 analysis 直接輸出了 sources（有些管線會有）
-                "used_contact_info_tool": used_contact_info_tool,  # 新增標記
-            },
+        # 排除每次請求都不同的欄位，並以固定順序序列化，讓相同分析產生相同輸入；
+        # sources / used_contact_info_tool 另外以獨立欄位帶入，不在 metadata 重複
+        stable_metadata = {
+            k: v
+            for k, v in metadata.items()
+            if k not in _VOLATILE_METADATA_KEYS
+            and k not in ("sources", "used_contact_info_tool")
+        }
+        analysis_output: Dict[str, JsonValue] = {
+            "decision": getattr(analysis.decision, "value", str(analysis.decision)),
+            "question_type": getattr(
+                analysis.question_type, "value", str(analysis.question_type)
+            ),
+            "confidence": analysis.confidence,
+            "draft_answer": analysis.draft_answer or "",
+            "used_contact_info_tool": used_contact_info_tool,  # 新增標記
         }
+        if stable_metadata:
+            analysis_output["metadata"] = stable_metadata
 
-        # 轉載檢索結果（若有）
+        # 轉載檢索結果（若有），摘錄截斷以控制輸入 token
         try:
             if analysis.retrievals:
-                analysis_data["analysis_output"]["retrievals"] = [
-                    {
-                        "doc_id": getattr(r, "doc_id", getattr(r, "id", None)),
-                        "score": getattr(r, "score", None),
-                        "excerpt": getattr(r, "excerpt", None),
-                        "metadata": getattr(r, "metadata", {}),
-                    }
-                    for r in analysis.retrievals[:5]
-                ]
+                views = _RETRIEVAL_LIST.validate_python(
+                    analysis.retrievals[:5], from_attributes=True
+                )
+                analysis_output["retrievals"] = sorted(
+                    _RETRIEVAL_LIST.dump_python(
+                        views, mode="json", exclude=_RETRIEVAL_DUMP_EXCLUDE
+                    ),
+                    key=lambda r: r["doc_id"] or "",
+                )
         except Exception as e:
-            logger.warning(f"轉換 retrievals 失敗：{e}")
+            logger.warning("轉換 retrievals 失敗：%s", e)
 
         # 若 analysis.metadata 內有 sources，帶入
-        try:
-            meta_sources = (analysis.metadata or {}).get("sources", [])
-            if isinstance(meta_sources, list):
-                analysis_data["analysis_output"]["sources"] = meta_sources[:5]
-        except Exception:
-            pass
+        if meta_sources:
+            analysis_output["sources"] = sorted(map(str, meta_sources[:5]))
+
+        analysis_data = {
+            "original_question": getattr(analysis, "query", ""),
+            "analysis_output": analysis_output,
+        }
 
         # **關鍵修正**：將字典轉換為 JSON 字串，這是 Runner.run() 期望的格式
-        input_text = json.dumps(analysis_data, ensure_ascii=False, indent=2)
+        # 緊湊格式：縮排與空白對模型沒有幫助，只會增加輸入 token
+        return None, _dumps(analysis_data)
 
-        # 執行 SDK Agent
-        try:
-            result = await Runner.run(self.sdk_agent, input=input_text)
-            logger.info(f"Evaluate Agent 回覆: {result}")
-        except Exception as e:
-            logger.error(f"執行 Evaluate Agent 時發生錯誤: {e}")
-            return EvaluationResult(
-                final_answer="抱歉，評估您的問題時發生錯誤，請稍後再試。",
-                sources=[],
-                confidence=0.0,
-                status=self._fallback_status(),
-                metadata={"error": str(e), "sdk_result": False},
-            )
+    def _sdk_error_result(self, error: str) -> EvaluationResult:
+        """執行 Evaluate Agent 失敗（含逾時）時的安全預設值"""
+        return EvaluationResult(
+            final_answer="抱歉，評估您的問題時發生錯誤，請稍後再試。",
+            sources=[],
+            confidence=0.0,
+            status=self._fallback_status(),
+            metadata={"error": error, "sdk_result": False},
+        )
 
+    def _build_evaluation(
+        self, result: Any, analysis: AnalysisResult
+    ) -> EvaluationResult:
+        """將 SDK 執行結果轉為 EvaluationResult"""
         # 解析結構化輸出（具備自我修復）
         output = self._safe_parse_output(result)
+        return self._evaluation_from_output(
+            output, analysis, getattr(result, "output", None)
+        )
+
+    def _evaluation_from_output(
+        self,
+        output: Optional[EvaluateOutput],
+        analysis: AnalysisResult,
+        raw_output: Any = None,
+    ) -> EvaluationResult:
+        """將解析後的 EvaluateOutput 轉為 EvaluationResult"""
         if output is None:
             logger.error("解析 Evaluate 輸出失敗，回傳安全預設值。")
             return EvaluationResult(
@@ -549,25 +1244,29 @@ class EvaluateAgent:
                 status=self._fallback_status(),
                 metadata={
                     "error": "failed_to_parse_output",
-                    "raw_output": getattr(result, "output", None),
+                    "raw_output": raw_output,
                 },
             )
 
         # 狀態映射為 AgentDecision
         status_enum = self._map_status_to_agent_decision(output.status)
 
-        # metadata 合併（補上 analysis 原始信心與原問題）
-        result_metadata: Dict[str, JsonValue] = {}
-        if isinstance(output.metadata, dict):
-            result_metadata.update(output.metadata)
-        result_metadata.setdefault("sdk_result", True)
-        result_metadata.setdefault("original_question", getattr(analysis, "query", ""))
-        result_metadata.setdefault("analysis_confidence", analysis.confidence)
+        # metadata 合併（補上 analysis 原始信心與原問題）：LLM 輸出優先，
+        # 預設值只補缺少的鍵，一次建立結果 dict
+        defaults: Dict[str, JsonValue] = {
+            "sdk_result": True,
+            "original_question": getattr(analysis, "query", ""),
+            "analysis_confidence": analysis.confidence,
+        }
+        llm_metadata = output.metadata if isinstance(output.metadata, dict) else {}
+        result_metadata: Dict[str, JsonValue] = dict(ChainMap(llm_metadata, defaults))
 
         # sources 已經是字串列表，直接使用
         sources = output.sources if isinstance(output.sources, list) else []
 
-        return EvaluationResult(
+        # 各欄位已在 EvaluateOutput 驗證過（confidence 範圍、status 列舉），
+        # 直接建構結果，不再重複驗證
+        return EvaluationResult.model_construct(
             final_answer=output.final_answer,
             sources=sources,
             confidence=output.confidence,
@@ -0,0 +1,269 @@
+"""共用快取元件
+
+提供 RAG 檢索與代理層共用的快取結構：
+- TTLCache: 具備 TTL 與 LRU 淘汰的執行緒安全快取
+- SemanticCache: 以隨機超平面 LSH 索引的語意快取，近似查詢直接命中
+- PersistentCache: 以 SQLite 儲存的磁碟快取，程序重啟後仍可命中
+- loop_bound_cache: 依 event loop 快取 async client，loop 改變時重建
+"""
+
+import asyncio
+import functools
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+_MISSING = object()
+
+
+class TTLCache:
+    """具備 TTL 與 LRU 淘汰的執行緒安全快取"""
+
+    def __init__(self, maxsize: int = 256, ttl_seconds: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """取得快取值；過期或不存在時回傳 default"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """寫入快取值，超過容量時淘汰最久未使用的項目"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """移除並回傳快取值"""
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[0]
+
+    def clear(self) -> None:
+        """清空快取"""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SemanticCache:
+    """以 LSH 索引的語意快取
+
+    查詢向量以 num_planes 個隨機超平面投影成位元簽章，作為分桶鍵；
+    查詢時探測同簽章及漢明距離 1 的鄰近桶，只對候選項計算餘弦相似度，
+    相似度 >= threshold 即視為命中。partition 用於區隔不同參數（如 top_k）。
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        num_planes: int = 8,
+        maxsize: int = 256,
+        ttl_seconds: float = 3600.0,
+        seed: int = 42,
+    ):
+        self.threshold = threshold
+        self.num_planes = num_planes
+        self._seed = seed
+        self._entries = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._buckets: Dict[Tuple[Hashable, int], List[int]] = {}
+        self._planes: Optional[np.ndarray] = None
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: Any) -> Optional[np.ndarray]:
+        vec = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vec))
+        if norm == 0.0:
+            return None
+        return vec / norm
+
+    def _signature(self, vec: np.ndarray) -> int:
+        if self._planes is None or self._planes.shape[1] != vec.shape[0]:
+            rng = np.random.default_rng(self._seed)
+            self._planes = rng.standard_normal(
+                (self.num_planes, vec.shape[0])
+            ).astype(np.float32)
+        bits = (self._planes @ vec) > 0
+        return sum(1 << i for i, bit in enumerate(bits) if bit)
+
+    def get(self, vector: Any, partition: Hashable = None) -> Any:
+        """查詢語意相近的快取值；未命中回傳 None"""
+        query = self._normalize(vector)
+        if query is None:
+            return None
+
+        with self._lock:
+            signature = self._signature(query)
+            probes = [signature]
+            probes.extend(signature ^ (1 << i) for i in range(self.num_planes))
+            best_value, best_similarity = None, self.threshold
+            for probe in probes:
+                bucket = self._buckets.get((partition, probe))
+                if not bucket:
+                    continue
+                alive: List[int] = []
+                for entry_id in bucket:
+                    entry = self._entries.get(entry_id)
+                    if entry is None:
+                        continue  # 已過期或被淘汰
+                    alive.append(entry_id)
+                    similarity = float(entry[0] @ query)
+                    if similarity >= best_similarity:
+                        best_value, best_similarity = entry[1], similarity
+                self._buckets[(partition, probe)] = alive
+            return best_value
+
+    def set(self, vector: Any, value: Any, partition: Hashable = None) -> None:
+        """寫入快取值"""
+        vec = self._normalize(vector)
+        if vec is None:
+            return
+
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries.set(entry_id, (vec, value))
+            key = (partition, self._signature(vec))
+            self._buckets.setdefault(key, []).append(entry_id)
+
+    def clear(self) -> None:
+        """清空快取"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PersistentCache:
+    """以 SQLite 儲存字串值的 TTL 磁碟快取
+
+    作為記憶體快取之後的 L2，重新部署 / 重啟後仍保有常見查詢的結果。
+    連線在第一次使用時才建立；tag 可用於整批失效（例如索引重建時）。
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "tag TEXT, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_tag ON cache(tag)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """取得快取值；過期或不存在時回傳 None"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            return row[0]
+
+    def set(self, key: str, value: str, tag: Optional[str] = None) -> None:
+        """寫入快取值"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, tag, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, tag, time.time() + self.ttl_seconds),
+            )
+            conn.commit()
+
+    def evict(self, tag: str) -> int:
+        """移除指定 tag 的所有項目，回傳移除數量"""
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute("DELETE FROM cache WHERE tag = ?", (tag,))
+            conn.commit()
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        """清空快取"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM cache")
+            conn.commit()
+
+    def close(self) -> None:
+        """關閉資料庫連線"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def loop_bound_cache(func: Callable[..., Any]) -> Callable[..., Any]:
+    """依 event loop 快取的裝飾器，用於持有 httpx 連線池的 async client
+
+    連線池綁定第一個使用它的 event loop，沿用到其他 loop（例如多次
+    asyncio.run）會失敗。相同參數在同一個 loop 內共用同一個物件，
+    執行中的 loop 改變時重新建立；每組參數只保留最近一個 loop 的物件。
+    """
+    entries: Dict[Hashable, Tuple[Any, Any]] = {}
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args: Hashable) -> Any:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        with lock:
+            entry = entries.get(args)
+            if entry is not None and entry[0] is loop:
+                return entry[1]
+            value = func(*args)
+            entries[args] = (loop, value)
+            return value
+
+    wrapper.cache_clear = entries.clear  # type: ignore[attr-defined]
+    return wrapper
+
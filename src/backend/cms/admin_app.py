@@ -16,6 +16,8 @@ import os
 import sys
 import asyncio
 import json
+import threading
+from functools import lru_cache
 from pathlib import Path
 
 # Add src directory to path
@@ -35,9 +37,9 @@ from src.backend.cms import (
     ImageProcessor,
     InfographicItem,
     InfographicsDataManager,
-    InfographicAssistantAgent,
     ThumbnailConfig,
 )
+from src.backend.cms.ai_assistant import suggest_infographic_metadata
 from src.backend.cms.project_manager import ProjectDataManager
 from src.backend.cms.language_manager import LanguageDataManager
 from src.backend.cms.models import ProjectItem
@@ -76,6 +78,19 @@ project_manager = ProjectDataManager(git_manager=git_manager)
 language_manager = LanguageDataManager(git_manager=git_manager)
 
 
+@lru_cache(maxsize=1)
+def _ai_event_loop() -> asyncio.AbstractEventLoop:
+    """Start the long-lived event loop used for AI assistant calls.
+
+    Gradio runs sync handlers in worker threads. Running every request on the
+    same loop lets the shared assistant agent keep one HTTP client instead of
+    rebuilding it per ``asyncio.run`` call.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="cms-ai-loop", daemon=True).start()
+    return loop
+
+
 def get_gallery_data() -> list[tuple[str, str]]:
     """Get data for gallery display: list of (image_path, caption)."""
     data = data_manager.load()
@@ -127,10 +142,12 @@ def ai_assist_metadata(title_zh: str) -> tuple[str, str]:
 
     try:
         existing_tags = data_manager.get_all_tags()
-        agent = InfographicAssistantAgent(existing_tags=existing_tags)
 
-        # Run async function in sync context
-        result = asyncio.run(agent.suggest_metadata(title_zh.strip()))
+        # Run async function in sync context on the shared AI loop
+        result = asyncio.run_coroutine_threadsafe(
+            suggest_infographic_metadata(title_zh.strip(), existing_tags),
+            _ai_event_loop(),
+        ).result()
 
         if result:
             title_en = result.title_en
@@ -6,8 +6,13 @@ for translating Chinese titles to English and suggesting appropriate tags.
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
 import os
+import threading
+from functools import lru_cache
+from typing import Any
 
 from dotenv import load_dotenv
 
@@ -15,6 +20,7 @@ from agents import Agent, AgentOutputSchema, ModelSettings, Runner
 from openai import AsyncOpenAI
 from agents.models.openai_chatcompletions import OpenAIChatCompletionsModel
 
+from ..cache import PersistentCache, SemanticCache
 from .models import TitleTagSuggestion
 
 load_dotenv(override=True)
@@ -22,6 +28,100 @@ load_dotenv(override=True)
 logger = logging.getLogger(__name__)
 
 
+# System prompt template; only {tags_list} varies between agents. Kept as a
+# module constant so building an agent is a single str.format call.
+_INSTRUCTIONS_TEMPLATE = """# 圖表元數據助理
+
+## 角色定位
+你是專業的圖表整理助理，負責協助使用者將圖表中文標題翻譯為英文，
+並根據圖表內容提供適合的分類標籤建議。
+
+## 核心任務
+1. **精確翻譯**：將中文標題翻譯成專業、簡潔的英文標題
+2. **智慧標籤**：根據中文標題內容推薦 1-3 個適合的分類標籤
+3. **優先既有標籤**：優先從現有標籤中選擇，必要時可建議新標籤
+
+## 現有標籤列表（優先使用）
+{tags_list}
+
+## 翻譯指南
+- 風格：專業、簡潔、易懂
+- 保留重點技術名詞或專有名詞
+- 避免過度翻譯，直譯往往更好
+- 建議長度：3-8 個單詞
+
+## 標籤建議規則
+1. **數量**：建議 1-3 個標籤
+2. **優先順序**：
+   - 優先使用現有標籤列表中的標籤
+   - 如有必要，可建議新標籤
+3. **格式**：每個標籤大寫，使用英文或 CamelCase
+4. **相關性**：只建議與圖表內容相關的標籤
+
+## 回應格式
+直接返回 JSON 格式的結果，包含 `title_en` 和 `suggested_tags` 兩個欄位。
+不需要任何其他說明文字。
+
+## 範例
+輸入中文標題：「導入Jenkins協助CI/CD自動化」
+輸出：
+{{
+  "title_en": "Introducing Jenkins to Enable CI/CD Automation",
+  "suggested_tags": ["CICD", "Architecture"]
+}}
+
+輸入中文標題：「具備多技能的單智能體失效時機」
+輸出：
+{{
+  "title_en": "When Multi-Skilled Single AI Agent Fails",
+  "suggested_tags": ["AI", "Multi Skills", "Design Pattern"]
+}}
+"""
+
+
+@lru_cache(maxsize=1)
+def _suggest_cache() -> PersistentCache:
+    """Process-wide exact-match suggestion cache shared by all agent instances.
+
+    The SQLite file is opened lazily on first access. Relative paths resolve
+    against the working directory, and ``cache/`` is git-ignored.
+    """
+    return PersistentCache(
+        os.getenv("CMS_SUGGEST_CACHE_PATH", "./cache/cms_suggest_cache.sqlite3"),
+        ttl_seconds=float(os.getenv("CMS_SUGGEST_CACHE_TTL", str(30 * 24 * 3600))),
+    )
+
+
+@lru_cache(maxsize=1)
+def _semantic_suggest_cache() -> SemanticCache:
+    """Process-wide semantic suggestion cache shared by all agent instances."""
+    return SemanticCache(
+        threshold=float(os.getenv("CMS_SUGGEST_SEMANTIC_THRESHOLD", "0.92")),
+        maxsize=int(os.getenv("CMS_SUGGEST_SEMANTIC_CACHE_SIZE", "1024")),
+        ttl_seconds=float(os.getenv("CMS_SUGGEST_CACHE_TTL", str(30 * 24 * 3600))),
+    )
+
+
+@lru_cache(maxsize=1)
+def _title_encoder() -> Any:
+    """Load the sentence-transformers title encoder on first use.
+
+    Returns None when sentence-transformers or the model is unavailable, in
+    which case the semantic cache is skipped.
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(
+            os.getenv(
+                "CMS_SUGGEST_EMBEDDING_MODEL", "paraphrase-multilingual-MiniLM-L12-v2"
+            )
+        )
+    except Exception as e:
+        logger.warning(f"Title encoder unavailable, semantic cache disabled: {e}")
+        return None
+
+
 class InfographicAssistantAgent:
     """AI assistant for infographic metadata assistance."""
 
@@ -39,11 +139,38 @@ class InfographicAssistantAgent:
             api_key: API key (default: from LITELLM_PROXY_API_KEY env var)
         """
         self.existing_tags = existing_tags or []
+        self.model_name = model or os.getenv("LITELLM_PROXY_MODEL", "gpt-4o")
+        self._model = model
+        self._api_key = api_key
         self.llm_model, self.model_settings = self._create_litellm_model_and_settings(
             model=model, api_key=api_key
         )
         self.sdk_agent = self._create_agent()
 
+        # The AsyncOpenAI client binds its connection pool to the first event
+        # loop that uses it; remember that loop so other loops get a new client.
+        self._bound_loop: asyncio.AbstractEventLoop | None = None
+        self._bind_lock = threading.Lock()
+
+        # Exact-match disk cache: re-uploads and retries of the same title skip
+        # the LLM. The key covers model and instructions (which embed the
+        # existing tags), so changing either invalidates old entries.
+        self._instructions_hash = hashlib.sha256(
+            self.sdk_agent.instructions.encode("utf-8")
+        ).hexdigest()
+        self._enable_suggest_cache = os.getenv(
+            "CMS_SUGGEST_CACHE", "true"
+        ).lower() in ("1", "true", "yes")
+        self._suggest_cache = _suggest_cache()
+
+        # Semantic cache: paraphrased titles reuse an earlier suggestion. Off by
+        # default because the first lookup loads an embedding model.
+        self._enable_semantic_cache = os.getenv(
+            "CMS_SUGGEST_SEMANTIC_CACHE", "false"
+        ).lower() in ("1", "true", "yes")
+        self._semantic_cache = _semantic_suggest_cache()
+        self._semantic_partition = (self.model_name, self._instructions_hash)
+
     def _create_litellm_model_and_settings(
         self, model: str | None = None, api_key: str | None = None
     ) -> tuple[OpenAIChatCompletionsModel, ModelSettings]:
@@ -66,6 +193,8 @@ class InfographicAssistantAgent:
             base_url=api_base,
             api_key=api_key,
         )
+        # Kept so the client can be closed when a new event loop replaces it
+        self._client = client
 
         # 使用 OpenAIChatCompletionsModel（相容非 OpenAI 後端）
         llm_model = OpenAIChatCompletionsModel(
@@ -94,6 +223,36 @@ class InfographicAssistantAgent:
             output_type=AgentOutputSchema(TitleTagSuggestion, strict_json_schema=False),
         )
 
+    async def _agent_for_running_loop(self) -> Agent:
+        """Return the SDK agent, rebuilding its model client for a new event loop.
+
+        Shared agents can outlive a single ``asyncio.run`` call, and reusing a
+        client from a closed loop fails on the next request. The replaced
+        client is closed so its connections are not leaked. Instructions are
+        unchanged, so cache keys stay the same. Long-running callers (the admin
+        app) keep one loop, so the client is normally built once.
+        """
+        loop = asyncio.get_running_loop()
+        stale_client = None
+        with self._bind_lock:
+            if self._bound_loop is not None and self._bound_loop is not loop:
+                stale_client = self._client
+                self.llm_model, self.model_settings = (
+                    self._create_litellm_model_and_settings(
+                        model=self._model, api_key=self._api_key
+                    )
+                )
+                self.sdk_agent = self._create_agent()
+            self._bound_loop = loop
+            agent = self.sdk_agent
+
+        if stale_client is not None:
+            try:
+                await stale_client.close()
+            except Exception as e:
+                logger.debug(f"Failed to close replaced model client: {e}")
+        return agent
+
     def _build_instructions(self) -> str:
         """Build the system instructions for the agent.
 
@@ -104,53 +263,7 @@ class InfographicAssistantAgent:
             ", ".join(self.existing_tags) if self.existing_tags else "無現有標籤"
         )
 
-        return f"""# 圖表元數據助理
-
-## 角色定位
-你是專業的圖表整理助理，負責協助使用者將圖表中文標題翻譯為英文，
-並根據圖表內容提供適合的分類標籤建議。
-
-## 核心任務
-1. **精確翻譯**：將中文標題翻譯成專業、簡潔的英文標題
-2. **智慧標籤**：根據中文標題內容推薦 1-3 個適合的分類標籤
-3. **優先既有標籤**：優先從現有標籤中選擇，必要時可建議新標籤
-
-## 現有標籤列表（優先使用）
-{tags_list}
-
-## 翻譯指南
-- 風格：專業、簡潔、易懂
-- 保留重點技術名詞或專有名詞
-- 避免過度翻譯，直譯往往更好
-- 建議長度：3-8 個單詞
-
-## 標籤建議規則
-1. **數量**：建議 1-3 個標籤
-2. **優先順序**：
-   - 優先使用現有標籤列表中的標籤
-   - 如有必要，可建議新標籤
-3. **格式**：每個標籤大寫，使用英文或 CamelCase
-4. **相關性**：只建議與圖表內容相關的標籤
-
-## 回應格式
-直接返回 JSON 格式的結果，包含 `title_en` 和 `suggested_tags` 兩個欄位。
-不需要任何其他說明文字。
-
-## 範例
-輸入中文標題：「導入Jenkins協助CI/CD自動化」
-輸出：
-{{
-  "title_en": "Introducing Jenkins to Enable CI/CD Automation",
-  "suggested_tags": ["CICD", "Architecture"]
-}}
-
-輸入中文標題：「具備多技能的單智能體失效時機」
-輸出：
-{{
-  "title_en": "When Multi-Skilled Single AI Agent Fails",
-  "suggested_tags": ["AI", "Multi Skills", "Design Pattern"]
-}}
-"""
+        return _INSTRUCTIONS_TEMPLATE.format(tags_list=tags_list)
 
     async def suggest_metadata(self, title_zh: str) -> TitleTagSuggestion:
         """Generate title and tag suggestions for a Chinese title.
@@ -168,11 +281,27 @@ class InfographicAssistantAgent:
         if not title_zh or not title_zh.strip():
             raise ValueError("Chinese title cannot be empty")
 
+        cached = self._load_cached_suggestion(title_zh)
+        if cached is not None:
+            logger.debug(f"Suggestion cache hit: {title_zh}")
+            return cached
+
+        title_vector = None
+        if self._enable_semantic_cache:
+            title_vector = await self._embed_title(title_zh.strip())
+            if title_vector is not None:
+                similar = self._semantic_cache.get(
+                    title_vector, partition=self._semantic_partition
+                )
+                if similar is not None:
+                    logger.debug(f"Semantic suggestion cache hit: {title_zh}")
+                    return similar.model_copy(deep=True)
+
         try:
             logger.debug(f"Processing title: {title_zh}")
 
             result = await Runner.run(
-                self.sdk_agent,
+                await self._agent_for_running_loop(),
                 input=f"中文標題：{title_zh.strip()}",
             )
 
@@ -205,12 +334,105 @@ class InfographicAssistantAgent:
             logger.info(
                 f"Successfully processed title: {title_zh} -> {suggestion.title_en}"
             )
+            self._store_cached_suggestion(title_zh, suggestion)
+            if title_vector is not None:
+                self._semantic_cache.set(
+                    title_vector,
+                    suggestion.model_copy(deep=True),
+                    partition=self._semantic_partition,
+                )
             return suggestion
 
         except Exception as e:
             logger.error(f"Failed to process title '{title_zh}': {str(e)}")
             raise
 
+    def _suggest_cache_key(self, title_zh: str) -> str:
+        """Build the cache key from model, instructions hash and title."""
+        raw = f"{self.model_name}|{self._instructions_hash}|{title_zh.strip()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    async def _embed_title(title_zh: str) -> Any:
+        """Embed a title off the event loop; None if no encoder is available."""
+        encoder = _title_encoder()
+        if encoder is None:
+            return None
+        try:
+            return await asyncio.to_thread(
+                encoder.encode, title_zh, normalize_embeddings=True
+            )
+        except Exception as e:
+            logger.debug(f"Failed to embed title: {e}")
+            return None
+
+    def _load_cached_suggestion(self, title_zh: str) -> TitleTagSuggestion | None:
+        """Return a cached suggestion, or None when disabled, missing or corrupt."""
+        if not self._enable_suggest_cache:
+            return None
+        try:
+            raw = self._suggest_cache.get(self._suggest_cache_key(title_zh))
+            if raw is None:
+                return None
+            return TitleTagSuggestion.model_validate_json(raw)
+        except Exception as e:
+            logger.debug(f"Failed to read suggestion cache: {e}")
+            return None
+
+    def _store_cached_suggestion(
+        self, title_zh: str, suggestion: TitleTagSuggestion
+    ) -> None:
+        """Persist a suggestion; failures are logged and otherwise ignored."""
+        if not self._enable_suggest_cache:
+            return
+        try:
+            self._suggest_cache.set(
+                self._suggest_cache_key(title_zh), suggestion.model_dump_json()
+            )
+        except Exception as e:
+            logger.debug(f"Failed to write suggestion cache: {e}")
+
+    async def suggest_metadata_batch(
+        self, titles_zh: list[str], max_concurrency: int | None = None
+    ) -> list[TitleTagSuggestion | None]:
+        """Generate suggestions for several Chinese titles concurrently.
+
+        All requests share this agent (and its system prompt), so a bulk upload
+        costs roughly one LLM round-trip of wall-clock time instead of N.
+
+        Args:
+            titles_zh: Chinese titles to process
+            max_concurrency: Maximum in-flight LLM requests
+                (default: CMS_SUGGEST_MAX_CONCURRENCY env var, or 8)
+
+        Returns:
+            Suggestions in input order; None for titles that failed
+        """
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("CMS_SUGGEST_MAX_CONCURRENCY", "8"))
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _bounded(title_zh: str) -> TitleTagSuggestion:
+            async with semaphore:
+                return await self.suggest_metadata(title_zh)
+
+        results = await asyncio.gather(
+            *(_bounded(t) for t in titles_zh), return_exceptions=True
+        )
+        return [None if isinstance(r, BaseException) else r for r in results]
+
+
+@lru_cache(maxsize=8)
+def _get_agent(existing_tags_key: tuple[str, ...]) -> InfographicAssistantAgent:
+    """Return a shared assistant agent for a given (sorted) tag list.
+
+    Reusing the agent avoids rebuilding the instructions per call and keeps the
+    system prompt byte-identical for provider prefix caches. The model client
+    is rebuilt when the event loop changes, so callers that want it reused
+    should run on one long-lived loop rather than ``asyncio.run`` per call.
+    """
+    return InfographicAssistantAgent(existing_tags=list(existing_tags_key))
+
 
 async def suggest_infographic_metadata(
     title_zh: str, existing_tags: list[str] | None = None
@@ -225,8 +447,28 @@ async def suggest_infographic_metadata(
         TitleTagSuggestion with suggestions, or None if an error occurs
     """
     try:
-        agent = InfographicAssistantAgent(existing_tags=existing_tags)
+        agent = _get_agent(tuple(sorted(existing_tags or [])))
         return await agent.suggest_metadata(title_zh)
     except Exception as e:
         logger.error(f"Error getting metadata suggestions: {str(e)}")
         return None
+
+
+async def suggest_infographic_metadata_batch(
+    titles_zh: list[str], existing_tags: list[str] | None = None
+) -> list[TitleTagSuggestion | None]:
+    """Convenience function to get metadata suggestions for several titles.
+
+    Args:
+        titles_zh: Chinese titles to process
+        existing_tags: List of existing tags to prioritize
+
+    Returns:
+        Suggestions in input order; None for titles that failed
+    """
+    try:
+        agent = _get_agent(tuple(sorted(existing_tags or [])))
+        return await agent.suggest_metadata_batch(titles_zh)
+    except Exception as e:
+        logger.error(f"Error getting batch metadata suggestions: {str(e)}")
+        return [None] * len(titles_zh)
@@ -2,6 +2,7 @@
 
 import json
 import logging
+import os
 from datetime import datetime
 from pathlib import Path
 
@@ -9,12 +10,48 @@ from .models import InfographicItem, InfographicsData
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+    ORJSON_AVAILABLE = False
+
+
+def _dump_json_bytes(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON, using orjson when available.
+
+    Datetimes go through ``str`` on both paths so the file format does not
+    depend on which serializer is installed.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            obj,
+            default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    return json.dumps(obj, ensure_ascii=False, indent=2, default=str).encode("utf-8")
+
 
 class InfographicsDataManager:
     """Manages reading and writing of infographics JSON data."""
 
     def __init__(self, data_file: str | Path):
         self.data_file = Path(data_file)
+        # Parsed data plus the (mtime_ns, size) of the file it came from; reads
+        # reuse it until the file changes on disk.
+        self._cache: InfographicsData | None = None
+        self._cache_stamp: tuple[int, int] | None = None
+        # Lookup indices over the cached data: id -> item and tag -> ids.
+        # Rebuilt whenever data is loaded or saved from outside, updated
+        # incrementally on manager mutations. List positions are rebuilt lazily.
+        self._id_index: dict[str, InfographicItem] = {}
+        self._tag_index: dict[str, set[str]] = {}
+        # Tags each id was indexed under. Items are handed out by reference, so
+        # the live item's tags may already have been changed by the caller.
+        self._item_tags: dict[str, frozenset[str]] = {}
+        self._positions: dict[str, int] | None = None
         self._ensure_data_file()
 
     def _ensure_data_file(self):
@@ -24,27 +61,91 @@ class InfographicsDataManager:
             self.save(InfographicsData())
             logger.info(f"Created new data file: {self.data_file}")
 
+    def _file_stamp(self) -> tuple[int, int]:
+        stat = self.data_file.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _rebuild_indices(self, data: InfographicsData) -> None:
+        self._id_index = {}
+        self._tag_index = {}
+        self._item_tags = {}
+        for img in data.images:
+            self._index_item(img)
+        self._positions = None
+
+    def _index_item(self, item: InfographicItem) -> None:
+        self._id_index[item.id] = item
+        self._item_tags[item.id] = frozenset(item.tags)
+        for tag in item.tags:
+            self._tag_index.setdefault(tag, set()).add(item.id)
+
+    def _unindex_item(self, item: InfographicItem) -> None:
+        self._id_index.pop(item.id, None)
+        for tag in self._item_tags.pop(item.id, frozenset()):
+            self._discard_tag(tag, item.id)
+
+    def _discard_tag(self, tag: str, item_id: str) -> None:
+        ids = self._tag_index.get(tag)
+        if ids is not None:
+            ids.discard(item_id)
+            if not ids:
+                del self._tag_index[tag]
+
+    def _position(self, data: InfographicsData, item_id: str) -> int:
+        if self._positions is None:
+            self._positions = {img.id: i for i, img in enumerate(data.images)}
+        return self._positions[item_id]
+
     def load(self) -> InfographicsData:
-        """Load infographics data from JSON file."""
+        """Load infographics data from JSON file.
+
+        The parsed data is cached and shared between calls until the file
+        changes on disk; after modifying it in place, pass it to ``save``.
+        """
         try:
+            stamp = self._file_stamp()
+            if self._cache is not None and stamp == self._cache_stamp:
+                return self._cache
             with open(self.data_file, "r", encoding="utf-8") as f:
                 data = json.load(f)
-            return InfographicsData(**data)
+            self._cache = InfographicsData(**data)
+            self._cache_stamp = stamp
+            self._rebuild_indices(self._cache)
+            return self._cache
         except Exception as e:
             logger.error(f"Failed to load data file: {e}")
-            return InfographicsData()
+            self._cache = None
+            empty = InfographicsData()
+            self._rebuild_indices(empty)
+            return empty
 
     def save(self, data: InfographicsData) -> bool:
-        """Save infographics data to JSON file."""
+        """Save infographics data to JSON file.
+
+        ``data`` may have been modified in place (e.g. the object returned by
+        ``load``), so the lookup indices are rebuilt from it.
+        """
+        if not self._write(data):
+            return False
+        self._rebuild_indices(data)
+        return True
+
+    def _write(self, data: InfographicsData) -> bool:
+        """Write data whose indices the caller has already updated."""
         try:
             data.lastUpdated = datetime.now().strftime("%Y-%m-%d")
-            with open(self.data_file, "w", encoding="utf-8") as f:
-                json.dump(
-                    data.model_dump(), f, ensure_ascii=False, indent=2, default=str
-                )
+            # Write to a sibling temp file and rename, so a crash mid-write
+            # never leaves a truncated data file behind.
+            tmp_file = self.data_file.with_suffix(self.data_file.suffix + ".tmp")
+            tmp_file.write_bytes(_dump_json_bytes(data.model_dump()))
+            os.replace(tmp_file, self.data_file)
+            self._cache = data
+            self._cache_stamp = self._file_stamp()
             logger.info(f"Saved data to: {self.data_file}")
             return True
         except Exception as e:
+            # The cached copy may hold unsaved changes; reload from disk next time
+            self._cache = None
             logger.error(f"Failed to save data file: {e}")
             return False
 
@@ -53,55 +154,96 @@ class InfographicsDataManager:
         data = self.load()
 
         # Check for duplicates
-        if any(img.id == item.id for img in data.images):
+        if item.id in self._id_index:
             logger.warning(f"Item with ID {item.id} already exists")
             return False
 
         data.images.insert(0, item)  # Add to beginning
-        return self.save(data)
+        self._index_item(item)
+        self._positions = None
+        return self._write(data)
+
+    def add_items(self, items: list[InfographicItem]) -> int:
+        """Add several items with a single write. Returns the number added."""
+        data = self.load()
+
+        new_items = []
+        for item in items:
+            if item.id in self._id_index:
+                logger.warning(f"Item with ID {item.id} already exists")
+                continue
+            self._index_item(item)
+            new_items.append(item)
+
+        if not new_items:
+            return 0
+        data.images[0:0] = new_items  # Add to beginning, keeping input order
+        self._positions = None
+        return len(new_items) if self._write(data) else 0
 
     def update_item(self, item: InfographicItem) -> bool:
         """Update an existing infographic item."""
         data = self.load()
 
-        for i, img in enumerate(data.images):
-            if img.id == item.id:
-                data.images[i] = item
-                return self.save(data)
+        if item.id not in self._id_index:
+            logger.warning(f"Item with ID {item.id} not found")
+            return False
 
-        logger.warning(f"Item with ID {item.id} not found")
-        return False
+        data.images[self._position(data, item.id)] = item
+        # Only tags that actually changed touch the tag index. Diff against the
+        # indexed snapshot: item may be the cached instance, edited in place.
+        old_tags, new_tags = self._item_tags[item.id], frozenset(item.tags)
+        for tag in old_tags - new_tags:
+            self._discard_tag(tag, item.id)
+        for tag in new_tags - old_tags:
+            self._tag_index.setdefault(tag, set()).add(item.id)
+        self._item_tags[item.id] = new_tags
+        self._id_index[item.id] = item
+        return self._write(data)
 
     def delete_item(self, item_id: str) -> InfographicItem | None:
         """Delete an infographic item by ID. Returns deleted item if found."""
         data = self.load()
 
-        for i, img in enumerate(data.images):
-            if img.id == item_id:
-                deleted = data.images.pop(i)
-                self.save(data)
-                return deleted
+        if item_id not in self._id_index:
+            logger.warning(f"Item with ID {item_id} not found")
+            return None
 
-        logger.warning(f"Item with ID {item_id} not found")
-        return None
+        deleted = data.images.pop(self._position(data, item_id))
+        self._unindex_item(deleted)
+        self._positions = None
+        self._write(data)
+        return deleted
+
+    def delete_items(self, item_ids: list[str]) -> list[InfographicItem]:
+        """Delete several items with a single write. Returns the deleted items."""
+        data = self.load()
+        ids = {item_id for item_id in item_ids if item_id in self._id_index}
+
+        if not ids:
+            return []
+        deleted = [img for img in data.images if img.id in ids]
+        data.images = [img for img in data.images if img.id not in ids]
+        for img in deleted:
+            self._unindex_item(img)
+        self._positions = None
+        self._write(data)
+        return deleted
 
     def get_item(self, item_id: str) -> InfographicItem | None:
         """Get a single infographic item by ID."""
-        data = self.load()
-        for img in data.images:
-            if img.id == item_id:
-                return img
-        return None
+        self.load()
+        return self._id_index.get(item_id)
 
     def get_all_tags(self) -> list[str]:
         """Get all unique tags from all items."""
-        data = self.load()
-        tags = set()
-        for img in data.images:
-            tags.update(img.tags)
-        return sorted(tags)
+        self.load()
+        return sorted(self._tag_index)
 
     def get_items_by_tag(self, tag: str) -> list[InfographicItem]:
         """Get all items with a specific tag."""
         data = self.load()
-        return [img for img in data.images if tag in img.tags]
+        ids = sorted(
+            self._tag_index.get(tag, ()), key=lambda i: self._position(data, i)
+        )
+        return [self._id_index[i] for i in ids]
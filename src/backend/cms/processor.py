@@ -3,7 +3,12 @@
 import hashlib
 import logging
 import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
+from typing import Any
 
 from PIL import Image
 
@@ -11,6 +16,28 @@ from .models import InfographicItem, ThumbnailConfig
 
 logger = logging.getLogger(__name__)
 
+# Images larger than this are encoded with libwebp's multi-threaded cwebp CLI
+# (when installed); smaller ones stay on Pillow to avoid the fork overhead.
+CWEBP_MIN_BYTES = 500 * 1024
+CWEBP_INPUT_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".webp"}
+
+# Set in process_uploaded_images workers: the pool already uses every core, so
+# workers encode with Pillow instead of spawning multi-threaded cwebp.
+_IN_POOL_WORKER = False
+
+
+def _mark_pool_worker() -> None:
+    """ProcessPoolExecutor initializer flagging the process as a pool worker."""
+    global _IN_POOL_WORKER
+    _IN_POOL_WORKER = True
+
+
+def _process_upload(
+    processor: "ImageProcessor", source_path: str | Path, metadata: dict[str, Any]
+) -> InfographicItem:
+    """Process one upload in a worker process (module-level so it pickles)."""
+    return processor.process_uploaded_image(source_path, **metadata)
+
 
 class ImageProcessor:
     """Handles image processing operations including thumbnail generation."""
@@ -46,40 +73,44 @@ class ImageProcessor:
         if not source_path.exists():
             raise FileNotFoundError(f"Source image not found: {source_path}")
 
-        # Generate thumbnail filename
-        thumb_ext = self.config.format.lower()
-        if thumb_ext == "jpeg":
-            thumb_ext = "jpg"
-        thumb_name = f"{source_path.stem}_thumb.{thumb_ext}"
-        thumb_path = self.thumbnails_dir / thumb_name
+        thumb_path = self._thumbnail_path(source_path)
 
         try:
             with Image.open(source_path) as img:
-                # Convert to RGB if necessary (for JPEG output)
-                if img.mode in ("RGBA", "P") and self.config.format == "JPEG":
-                    img = img.convert("RGB")
-                elif img.mode not in ("RGB", "RGBA"):
-                    img = img.convert("RGB")
+                self._save_thumbnail(img, thumb_path)
+                return thumb_path
 
-                # Calculate new dimensions maintaining aspect ratio
-                img.thumbnail(
-                    (self.config.max_width, self.config.max_height), Image.LANCZOS
-                )
+        except Exception as e:
+            logger.error(f"Failed to create thumbnail for {source_path}: {e}")
+            raise
 
-                # Save thumbnail
-                save_params = {"quality": self.config.quality, "optimize": True}
+    def _thumbnail_path(self, image_path: Path) -> Path:
+        """Return the thumbnail path for an image."""
+        thumb_ext = self.config.format.lower()
+        if thumb_ext == "jpeg":
+            thumb_ext = "jpg"
+        return self.thumbnails_dir / f"{image_path.stem}_thumb.{thumb_ext}"
 
-                if self.config.format == "WEBP":
-                    save_params["method"] = 6
+    def _save_thumbnail(self, img: Image.Image, thumb_path: Path) -> None:
+        """Resize an already-decoded image in place and save it as a thumbnail."""
+        # Convert to RGB if necessary (for JPEG output)
+        if img.mode in ("RGBA", "P") and self.config.format == "JPEG":
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
 
-                img.save(thumb_path, format=self.config.format, **save_params)
+        # Calculate new dimensions maintaining aspect ratio
+        img.thumbnail((self.config.max_width, self.config.max_height), Image.LANCZOS)
 
-                logger.info(f"Created thumbnail: {thumb_path}")
-                return thumb_path
+        # Save thumbnail
+        save_params = {"quality": self.config.quality, "optimize": True}
 
-        except Exception as e:
-            logger.error(f"Failed to create thumbnail for {source_path}: {e}")
-            raise
+        if self.config.format == "WEBP":
+            save_params["method"] = 6
+
+        img.save(thumb_path, format=self.config.format, **save_params)
+
+        logger.info(f"Created thumbnail: {thumb_path}")
 
     def process_uploaded_image(
         self,
@@ -105,7 +136,87 @@ class ImageProcessor:
         target_name = f"{img_id}.webp"
         target_path = self.images_dir / target_name
 
-        # Convert original image to WebP format
+        # Convert original image to WebP format and create the thumbnail
+        thumb_path = self._convert_to_webp(
+            source_path, target_path, with_thumbnail=True
+        )
+
+        # Create relative URLs for frontend
+        base_url = "static/images/infographics"
+        url = f"{base_url}/{target_path.name}"
+        thumbnail_url = f"{base_url}/thumbnails/{thumb_path.name}"
+
+        return InfographicItem(
+            id=img_id,
+            url=url,
+            thumbnail=thumbnail_url,
+            title=title_zh or title_en,
+            title_zh=title_zh,
+            title_en=title_en,
+            tags=tags or [],
+            source=source,
+        )
+
+    def process_uploaded_images(
+        self,
+        source_paths: list[str | Path],
+        metadata: list[dict[str, Any]] | None = None,
+        max_workers: int | None = None,
+    ) -> list[InfographicItem]:
+        """
+        Process several uploaded images in parallel worker processes.
+
+        WebP encoding and thumbnailing are CPU-bound, so each image is handled
+        by process_uploaded_image in its own process, encoding with Pillow
+        rather than multi-threaded cwebp. ``metadata`` holds the per-image
+        keyword arguments (title_zh, title_en, tags, source).
+
+        Returns the InfographicItems in input order; the first failure is
+        re-raised, as with process_uploaded_image.
+        """
+        if metadata is None:
+            metadata = [{} for _ in source_paths]
+        if len(metadata) != len(source_paths):
+            raise ValueError("metadata must have one entry per source path")
+
+        # A single image is not worth the process start-up cost
+        if len(source_paths) <= 1:
+            return [
+                self.process_uploaded_image(path, **meta)
+                for path, meta in zip(source_paths, metadata)
+            ]
+
+        workers = min(max_workers or os.cpu_count() or 1, len(source_paths))
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_mark_pool_worker
+        ) as executor:
+            return list(
+                executor.map(_process_upload, repeat(self), source_paths, metadata)
+            )
+
+    def _convert_to_webp(
+        self, source_path: Path, target_path: Path, with_thumbnail: bool = False
+    ) -> Path | None:
+        """
+        Convert an image to WebP, using cwebp -mt for large inputs.
+
+        With ``with_thumbnail``, also creates the thumbnail and returns its
+        path. Either way the source is decoded once in this process: the
+        Pillow path reuses the image it encoded, and the cwebp path decodes
+        the source for the thumbnail instead of re-reading the encoded WebP.
+        """
+        if self._convert_with_cwebp(source_path, target_path):
+            if not with_thumbnail:
+                return None
+            thumb_path = self._thumbnail_path(target_path)
+            try:
+                with Image.open(source_path) as img:
+                    self._save_thumbnail(img, thumb_path)
+            except Exception as e:
+                logger.error(f"Failed to create thumbnail for {source_path}: {e}")
+                raise
+            return thumb_path
+
         try:
             with Image.open(source_path) as img:
                 # Convert to RGB if necessary (WebP supports RGBA too)
@@ -121,28 +232,55 @@ class ImageProcessor:
                 img.save(target_path, format="WEBP", **save_params)
                 logger.info(f"Converted image to WebP: {target_path}")
 
+                if not with_thumbnail:
+                    return None
+                thumb_path = self._thumbnail_path(target_path)
+                self._save_thumbnail(img, thumb_path)
+                return thumb_path
+
         except Exception as e:
             logger.error(f"Failed to convert image to WebP: {e}")
             raise
 
-        # Create thumbnail
-        thumb_path = self.create_thumbnail(target_path)
+    def _convert_with_cwebp(self, source_path: Path, target_path: Path) -> bool:
+        """
+        Encode a large image with the cwebp CLI using all cores.
 
-        # Create relative URLs for frontend
-        base_url = "static/images/infographics"
-        url = f"{base_url}/{target_path.name}"
-        thumbnail_url = f"{base_url}/thumbnails/{thumb_path.name}"
+        Returns False when running in a pool worker, cwebp is unavailable, the
+        input is small or in an unsupported format, or encoding fails, so the
+        caller can fall back to Pillow.
+        """
+        if _IN_POOL_WORKER:
+            return False
+        if source_path.suffix.lower() not in CWEBP_INPUT_SUFFIXES:
+            return False
+        if source_path.stat().st_size <= CWEBP_MIN_BYTES:
+            return False
 
-        return InfographicItem(
-            id=img_id,
-            url=url,
-            thumbnail=thumbnail_url,
-            title=title_zh or title_en,
-            title_zh=title_zh,
-            title_en=title_en,
-            tags=tags or [],
-            source=source,
-        )
+        cwebp = shutil.which("cwebp")
+        if not cwebp:
+            return False
+
+        cmd = [
+            cwebp,
+            "-quiet",
+            "-q",
+            str(self.config.original_quality),
+            "-m",
+            "6",
+            "-mt",
+            str(source_path),
+            "-o",
+            str(target_path),
+        ]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"cwebp failed for {source_path}, using Pillow: {e}")
+            return False
+
+        logger.info(f"Converted image to WebP with cwebp: {target_path}")
+        return True
 
     def delete_image(self, item: InfographicItem) -> bool:
         """Delete an image and its thumbnail."""
@@ -3,7 +3,7 @@
 根據開發計劃中的 Pydantic Models 設計
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Literal, Dict
 from datetime import datetime
 import enum
@@ -30,7 +30,12 @@ class AgentDecision(str, enum.Enum):
 
 
 class SearchResult(BaseModel):
-    """RAG 檢索結果"""
+    """RAG 檢索結果
+
+    檢索結果會被 RAG 查詢快取 / 語意快取在多個請求間共用，因此設為不可變。
+    """
+
+    model_config = ConfigDict(frozen=True)
 
     doc_id: str = Field(..., description="文件唯一識別碼")
     score: float = Field(..., ge=0, le=1, description="相關性分數")
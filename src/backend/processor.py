@@ -11,8 +11,8 @@ from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 
 from backend.models import Question, SystemResponse
-from backend.tools.rag import RAGTools
 from backend.agents import AnalysisAgent, EvaluateAgent
+from backend.agents.analysis import get_rag_tools_instance, warmup_analysis_agent
 
 logger = logging.getLogger(__name__)
 
@@ -84,7 +84,8 @@ class ResumeMateProcessor:
             max_concurrent_requests: 最大並發請求數
         """
         # 🔧 核心組件初始化
-        self.rag_tools = RAGTools()
+        # 與 rag_search_tool 共用同一個 RAGTools 實例，collection handle 只取得一次
+        self.rag_tools = get_rag_tools_instance()
         self.analysis_agent = AnalysisAgent()
         self.evaluate_agent = EvaluateAgent()
 
@@ -107,6 +108,10 @@ class ResumeMateProcessor:
             f"⚙️  配置: 最大並發={max_concurrent_requests}, 緩存TTL={self.cache_ttl}s"
         )
 
+    def warmup(self) -> None:
+        """啟動時預熱 RAG 模型與索引 🔥"""
+        warmup_analysis_agent()
+
     async def process_question(self, question: Question) -> SystemResponse:
         """高效主處理流程 🎯
 
@@ -1,5 +1,22 @@
-"""Tools package initialization"""
+"""Tools package initialization
 
-from .rag import RAGTools
+RAGTools is imported lazily because `rag` loads chromadb and
+sentence-transformers; importing `backend.tools.contact` should not pay
+for that.
+"""
+
+import importlib
 
 __all__ = ["RAGTools"]
+
+
+def __getattr__(name: str):
+    """Lazily import RAGTools on first access."""
+    if name == "RAGTools":
+        module = importlib.import_module(".rag", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__} has no attribute {name}")
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
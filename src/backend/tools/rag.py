@@ -10,11 +10,13 @@ import time
 import json
 import hashlib
 import logging
+import threading
 from dataclasses import dataclass
 from typing import Any, List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
 import chromadb
+import numpy as np
 from chromadb.config import Settings
 
 try:
@@ -25,6 +27,7 @@ except ImportError:
     SentenceTransformer = Any  # type: ignore[assignment]
     SENTENCE_TRANSFORMERS_AVAILABLE = False
 
+from backend.cache import PersistentCache, SemanticCache
 from backend.models import SearchResult
 
 # 載入環境變數
@@ -56,6 +59,16 @@ class RAGConfig:
     similarity_threshold: float = 0.1  # 相似度過濾閾值
     query_preprocessing: bool = True  # 啟用查詢預處理
     result_reranking: bool = True  # 啟用結果重排序
+    enable_semantic_cache: bool = True  # 啟用語意快取（近似查詢直接命中）
+    semantic_cache_threshold: float = 0.95  # 語意快取命中的餘弦相似度門檻
+    enable_persistent_cache: bool = False  # 啟用磁碟查詢快取（重啟後仍有效，需明確開啟）
+    persistent_cache_path: str = "./cache/rag_query_cache.sqlite3"
+    persistent_cache_ttl_seconds: int = 7 * 24 * 3600  # 磁碟快取存活 7 天
+
+    # 🧭 HNSW 向量索引參數（套用於新建立 / 重建的 collection）
+    hnsw_m: int = 16  # 每個節點的鄰居數
+    hnsw_construction_ef: int = 200  # 建索引時的候選集大小
+    hnsw_search_ef: int = 64  # 查詢時的候選集大小（召回率 / 速度權衡）
 
     def get_collection_name(self) -> str:
         """根據使用的模型自動選擇 collection 名稱"""
@@ -97,8 +110,29 @@ class RAGConfig:
             collection_name=_strip_quotes(
                 os.getenv("CHROMA_COLLECTION_NAME", cls.collection_name)
             ),
+            enable_persistent_cache=os.getenv(
+                "RAG_PERSISTENT_CACHE", str(cls.enable_persistent_cache)
+            ).lower()
+            in ("1", "true", "yes"),
+            persistent_cache_path=_strip_quotes(
+                os.getenv("RAG_PERSISTENT_CACHE_PATH", cls.persistent_cache_path)
+            ),
+            hnsw_m=int(os.getenv("HNSW_M", cls.hnsw_m)),
+            hnsw_construction_ef=int(
+                os.getenv("HNSW_CONSTRUCTION_EF", cls.hnsw_construction_ef)
+            ),
+            hnsw_search_ef=int(os.getenv("HNSW_SEARCH_EF", cls.hnsw_search_ef)),
         )
 
+    def get_hnsw_metadata(self) -> Dict[str, Any]:
+        """回傳建立 collection 時使用的 HNSW 索引設定"""
+        return {
+            "hnsw:space": "l2",  # 嵌入向量已正規化，L2 排序等同餘弦
+            "hnsw:M": self.hnsw_m,
+            "hnsw:construction_ef": self.hnsw_construction_ef,
+            "hnsw:search_ef": self.hnsw_search_ef,
+        }
+
 
 class RAGTools:
     """改進的 RAG (檢索增強生成) 系統工具類別
@@ -122,14 +156,28 @@ class RAGTools:
         self._query_cache: Dict[
             str, Tuple[List[SearchResult], float]
         ] = {}  # (結果, 時間戳)
-        self._embedding_cache: Dict[str, Tuple[List[float], float]] = {}  # 嵌入向量快取
+        # 嵌入向量快取（float32 ndarray，每維 4 bytes，遠小於 Python float list）
+        self._embedding_cache: Dict[str, Tuple[np.ndarray, float]] = {}
         self._preprocessed_queries: Dict[str, str] = {}  # 預處理查詢快取
+        # 語意快取：以查詢向量 LSH 分桶，換句話說的查詢可跳過向量檢索
+        self._semantic_cache = SemanticCache(
+            threshold=self.config.semantic_cache_threshold,
+            maxsize=self.config.cache_size,
+            ttl_seconds=self.config.cache_ttl_seconds,
+        )
+        # 磁碟 L2 快取：記憶體快取未命中時使用，首次存取才開啟檔案
+        self._persistent_cache = PersistentCache(
+            self.config.persistent_cache_path,
+            ttl_seconds=self.config.persistent_cache_ttl_seconds,
+        )
 
         # 📊 性能監控
         self._query_stats = {
             "total_queries": 0,
             "cache_hits": 0,
             "embedding_cache_hits": 0,
+            "semantic_cache_hits": 0,
+            "persistent_cache_hits": 0,
             "avg_response_time": 0.0,
             "last_reset_time": time.time(),
         }
@@ -195,7 +243,9 @@ class RAGTools:
                 logger.debug(
                     f"無法獲取 collection {collection_name}: {get_collection_error}"
                 )
-                self.collection = self.dbClient.create_collection(collection_name)
+                self.collection = self.dbClient.create_collection(
+                    collection_name, metadata=self.config.get_hnsw_metadata()
+                )
                 logger.info(f"創建新的 {collection_name} collection")
 
             self._auto_migrate_from_openai_collection(collection_name)
@@ -455,15 +505,18 @@ class RAGTools:
         """使用本地模型生成嵌入向量"""
         try:
             # Sentence Transformers 自動處理批次，非常高效
+            # 索引與查詢皆輸出單位向量：L2 距離 d² = 2 - 2·cos，
+            # 排序等同餘弦相似度，且 (2 - d) / 2 的分數換算保持一致
             embeddings = self.local_model.encode(
                 texts,
                 batch_size=self.config.batch_size,
                 show_progress_bar=False,
-                convert_to_numpy=False,  # 保持為 tensor，後續轉為 list
+                convert_to_numpy=True,
+                normalize_embeddings=True,
             )
 
-            # 轉換為 list 格式
-            embeddings_list = [embedding.tolist() for embedding in embeddings]
+            # 整個矩陣一次轉為 list 格式
+            embeddings_list = embeddings.tolist()
 
             logger.debug(f"本地模型成功生成 {len(embeddings_list)} 個嵌入向量")
             return embeddings_list
@@ -507,6 +560,14 @@ class RAGTools:
                 logger.debug(f"✨ 快取命中: {query[:30]}...")
                 return self._query_cache[cache_key][0]
 
+            # 💽 檢查磁碟快取（跨重啟保留）
+            persisted = self._load_persisted_results(cache_key)
+            if persisted is not None:
+                self._query_stats["persistent_cache_hits"] += 1
+                if self.config.enable_query_cache:
+                    self._query_cache[cache_key] = (persisted, time.time())
+                return persisted
+
             # 🔍 查詢預處理
             processed_query = (
                 self._preprocess_query(query)
@@ -516,10 +577,20 @@ class RAGTools:
 
             # 🎯 智慧嵌入向量處理
             query_embedding = self._get_embedding_with_cache(processed_query)
-            if not query_embedding:
+            if query_embedding is None:
                 logger.warning("查詢嵌入向量生成失敗，回傳空結果")
                 return []
 
+            # 🧠 語意快取：相近查詢（同 top_k）直接回傳先前結果
+            if self.config.enable_semantic_cache:
+                cached_results = self._semantic_cache.get(
+                    query_embedding, partition=top_k
+                )
+                if cached_results is not None:
+                    self._query_stats["semantic_cache_hits"] += 1
+                    logger.debug(f"🧠 語意快取命中: {query[:30]}...")
+                    return cached_results
+
             # 🔍 執行向量查詢（增加檢索數量用於重排序）
             search_top_k = (
                 min(top_k * 2, self.config.max_top_k)
@@ -545,6 +616,11 @@ class RAGTools:
             ):
                 current_time = time.time()
                 self._query_cache[cache_key] = (search_results, current_time)
+            if self.config.enable_semantic_cache:
+                self._semantic_cache.set(
+                    query_embedding, search_results, partition=top_k
+                )
+            self._persist_results(cache_key, search_results)
 
             # 📈 更新性能統計
             elapsed_time = time.time() - start_time
@@ -559,6 +635,209 @@ class RAGTools:
             logger.error(f"❌ RAG 檢索失敗: {e}")
             return []
 
+    def rag_search_soa(
+        self, query: str, top_k: int = 10
+    ) -> Tuple[List[str], List[float], List[str], List[Dict[str, Any]]]:
+        """以欄位陣列（SoA）形式回傳檢索結果
+
+        結構固定為 SearchResult，直接取欄位，呼叫端可用 zip 組裝輸出，
+        不需逐筆做型別探測。
+
+        Args:
+            query: 查詢字串
+            top_k: 回傳結果數量
+
+        Returns:
+            Tuple: (doc_ids, scores, excerpts, metadatas)
+        """
+        results = self.rag_search(query, top_k=top_k)
+        return (
+            [r.doc_id for r in results],
+            [r.score for r in results],
+            [r.excerpt for r in results],
+            [r.metadata for r in results],
+        )
+
+    def rag_search_batch(
+        self, queries: List[str], top_k: int = 10
+    ) -> List[List[SearchResult]]:
+        """批次執行 RAG 檢索：單次嵌入 + 單次向量查詢 🚀
+
+        適用於同一輪對話中的多個查詢（原始問題與同義詞擴展），
+        未命中快取的查詢只做一次批次 encode 與一次 collection.query。
+
+        Args:
+            queries: 查詢字串列表
+            top_k: 每個查詢回傳的結果數量
+
+        Returns:
+            List[List[SearchResult]]: 與 queries 順序對應的檢索結果
+        """
+        start_time = time.time()
+        batch_results: List[List[SearchResult]] = [[] for _ in queries]
+        # 預處理後的查詢 -> 對應的 (原始索引, 快取鍵) 列表，相同查詢只檢索一次
+        pending: Dict[str, List[Tuple[int, str]]] = {}
+
+        for index, query in enumerate(queries):
+            try:
+                self._validate_input(query, top_k)
+            except ValueError as e:
+                logger.warning(f"略過無效查詢 #{index}: {e}")
+                continue
+
+            self._query_stats["total_queries"] += 1
+
+            # 🎯 檢查查詢快取
+            cache_key = self._get_cache_key(query, top_k)
+            if (
+                self.config.enable_query_cache
+                and cache_key in self._query_cache
+                and self._is_cache_valid(self._query_cache[cache_key][1])
+            ):
+                self._query_stats["cache_hits"] += 1
+                batch_results[index] = self._query_cache[cache_key][0]
+                continue
+
+            processed_query = (
+                self._preprocess_query(query)
+                if self.config.query_preprocessing
+                else query
+            )
+            pending.setdefault(processed_query, []).append((index, cache_key))
+
+        if not pending:
+            return batch_results
+
+        try:
+            processed_queries = list(pending)
+            query_embeddings = self._get_embeddings_with_cache(processed_queries)
+            if len(query_embeddings) != len(processed_queries):
+                logger.warning("批次查詢嵌入向量生成失敗，回傳空結果")
+                return batch_results
+
+            search_top_k = (
+                min(top_k * 2, self.config.max_top_k)
+                if self.config.result_reranking
+                else top_k
+            )
+
+            # 🔍 單次向量查詢涵蓋所有未命中快取的查詢
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=search_top_k,
+                include=["documents", "metadatas", "distances"],
+            )
+
+            current_time = time.time()
+            for row, processed_query in enumerate(processed_queries):
+                search_results = self._process_search_results(
+                    results, processed_query, top_k, row=row
+                )
+                for index, cache_key in pending[processed_query]:
+                    batch_results[index] = search_results
+                    if (
+                        self.config.enable_query_cache
+                        and len(self._query_cache) < self.config.cache_size
+                    ):
+                        self._query_cache[cache_key] = (search_results, current_time)
+
+            elapsed_time = time.time() - start_time
+            self._update_performance_stats(elapsed_time)
+            logger.info(
+                f"🎯 RAG 批次檢索完成: {len(queries)} 查詢（{len(processed_queries)} 次向量檢索）({elapsed_time:.3f}s)"
+            )
+        except Exception as e:
+            logger.error(f"❌ RAG 批次檢索失敗: {e}")
+
+        return batch_results
+
+    def _persistent_cache_tag(self) -> str:
+        """磁碟快取的版本標記：嵌入模型 + collection + 文件數，任一變動即不共用"""
+        try:
+            count = self.collection.count()
+        except Exception:
+            count = -1
+        return (
+            f"{self.config.local_model_name}:"
+            f"{self.config.get_collection_name()}:{count}"
+        )
+
+    def _persistent_cache_key(self, cache_key: str) -> str:
+        tag = self._persistent_cache_tag()
+        return hashlib.sha256(f"{tag}:{cache_key}".encode()).hexdigest()
+
+    def _load_persisted_results(self, cache_key: str) -> Optional[List[SearchResult]]:
+        """從磁碟快取讀取檢索結果；停用或失敗時回傳 None"""
+        if not self.config.enable_persistent_cache:
+            return None
+        try:
+            raw = self._persistent_cache.get(self._persistent_cache_key(cache_key))
+            if raw is None:
+                return None
+            return [SearchResult(**item) for item in json.loads(raw)]
+        except Exception as e:
+            logger.debug(f"讀取磁碟快取失敗: {e}")
+            return None
+
+    def _persist_results(self, cache_key: str, results: List[SearchResult]) -> None:
+        """將檢索結果寫入磁碟快取；失敗時僅記錄，不影響檢索"""
+        if not self.config.enable_persistent_cache:
+            return
+        try:
+            self._persistent_cache.set(
+                self._persistent_cache_key(cache_key),
+                json.dumps([r.model_dump() for r in results], ensure_ascii=False),
+                tag=self._persistent_cache_tag(),
+            )
+        except Exception as e:
+            logger.debug(f"寫入磁碟快取失敗: {e}")
+
+    def warmup(self) -> None:
+        """預熱嵌入模型與向量索引 🔥
+
+        直接 encode 並查詢 collection，不經過查詢 / 嵌入 / 語意 / 磁碟快取，
+        也不計入檢索統計，避免留下假的 warmup 項目。
+        """
+        embeddings = self._as_float32(self._embed_texts_with_retry(["warmup"]))
+        if embeddings and self.collection.count() > 0:
+            self.collection.query(
+                query_embeddings=[embeddings[0]],
+                n_results=1,
+                include=["distances"],
+            )
+
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """取得查詢的嵌入向量（與檢索共用預處理與嵌入快取）
+
+        Args:
+            query: 查詢字串
+
+        Returns:
+            Optional[np.ndarray]: float32 嵌入向量；生成失敗時回傳 None
+        """
+        processed_query = (
+            self._preprocess_query(query) if self.config.query_preprocessing else query
+        )
+        return self._get_embedding_with_cache(processed_query)
+
+    def cached_query_embedding(self, query: str) -> Optional[np.ndarray]:
+        """只查詢嵌入快取、不執行 encode；未命中或停用快取時回傳 None
+
+        檢索時已編碼過的查詢可直接沿用向量（例如評估層的語意快取）。
+        """
+        if not self.config.enable_embedding_cache:
+            return None
+        processed_query = (
+            self._preprocess_query(query) if self.config.query_preprocessing else query
+        )
+        cached = self._embedding_cache.get(
+            hashlib.md5(processed_query.encode()).hexdigest()
+        )
+        if cached is None or not self._is_cache_valid(cached[1]):
+            return None
+        self._query_stats["embedding_cache_hits"] += 1
+        return cached[0]
+
     def _preprocess_query(self, query: str) -> str:
         """查詢預處理優化 🔧"""
         if query in self._preprocessed_queries:
@@ -579,43 +858,72 @@ class RAGTools:
 
         return processed
 
-    def _get_embedding_with_cache(self, text: str) -> Optional[List[float]]:
+    def _get_embedding_with_cache(self, text: str) -> Optional[np.ndarray]:
         """帶快取的嵌入向量獲取 ⚡"""
+        embeddings = self._get_embeddings_with_cache([text])
+        return embeddings[0] if embeddings else None
+
+    def _get_embeddings_with_cache(self, texts: List[str]) -> List[np.ndarray]:
+        """批次取得嵌入向量，僅對未命中快取的文字執行一次 encode ⚡
+
+        回傳 float32 ndarray（ChromaDB 可直接接受），快取同樣以 float32 保存。
+        """
         if not self.config.enable_embedding_cache:
-            embeddings = self._embed_texts_with_retry([text])
-            return embeddings[0] if embeddings else None
-
-        # 檢查嵌入快取
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        if text_hash in self._embedding_cache and self._is_cache_valid(
-            self._embedding_cache[text_hash][1]
-        ):
-            self._query_stats["embedding_cache_hits"] += 1
-            return self._embedding_cache[text_hash][0]
-
-        # 生成新的嵌入向量
-        embeddings = self._embed_texts_with_retry([text])
-        if embeddings:
-            # 快取嵌入向量
-            if len(self._embedding_cache) < self.config.cache_size * 2:
-                current_time = time.time()
-                self._embedding_cache[text_hash] = (embeddings[0], current_time)
-            return embeddings[0]
+            return self._as_float32(self._embed_texts_with_retry(texts))
+
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: List[int] = []
+        for i, text in enumerate(texts):
+            text_hash = hashlib.md5(text.encode()).hexdigest()
+            cached = self._embedding_cache.get(text_hash)
+            if cached is not None and self._is_cache_valid(cached[1]):
+                self._query_stats["embedding_cache_hits"] += 1
+                embeddings[i] = cached[0]
+            else:
+                missing.append(i)
 
-        return None
+        if missing:
+            new_embeddings = self._as_float32(
+                self._embed_texts_with_retry([texts[i] for i in missing])
+            )
+            if len(new_embeddings) != len(missing):
+                return []
+            current_time = time.time()
+            for i, embedding in zip(missing, new_embeddings):
+                embeddings[i] = embedding
+                if len(self._embedding_cache) < self.config.cache_size * 2:
+                    text_hash = hashlib.md5(texts[i].encode()).hexdigest()
+                    self._embedding_cache[text_hash] = (embedding, current_time)
+
+        return embeddings
+
+    @staticmethod
+    def _as_float32(embeddings: List[List[float]]) -> List[np.ndarray]:
+        """將嵌入向量轉為 float32 ndarray 列表"""
+        if not embeddings:
+            return []
+        return list(np.asarray(embeddings, dtype=np.float32))
 
     def _process_search_results(
-        self, results: Dict, query: str, top_k: int
+        self, results: Dict, query: str, top_k: int, row: int = 0
     ) -> List[SearchResult]:
-        """處理和優化搜索結果 📊"""
-        if not results["ids"] or not results["ids"][0]:
+        """處理和優化搜索結果 📊
+
+        Args:
+            results: ChromaDB 查詢結果
+            query: 預處理後的查詢字串（用於重排序）
+            top_k: 回傳結果數量
+            row: 批次查詢時對應的結果列索引
+        """
+        ids = results["ids"]
+        if not ids or len(ids) <= row or not ids[row]:
             return []
 
         search_results = []
 
-        for i in range(len(results["ids"][0])):
+        for i in range(len(results["ids"][row])):
             # ChromaDB 餘弦距離轉換為相似度分數
-            distance = results["distances"][0][i]
+            distance = results["distances"][row][i]
             similarity = max(0.0, min(1.0, (2.0 - distance) / 2.0))
 
             # 應用相似度閾值過濾
@@ -623,10 +931,10 @@ class RAGTools:
                 continue
 
             search_result = SearchResult(
-                doc_id=results["ids"][0][i],
+                doc_id=results["ids"][row][i],
                 score=similarity,
-                excerpt=results["documents"][0][i] or "",
-                metadata=results["metadatas"][0][i] or {},
+                excerpt=results["documents"][row][i] or "",
+                metadata=results["metadatas"][row][i] or {},
             )
             search_results.append(search_result)
 
@@ -696,6 +1004,8 @@ class RAGTools:
             "total_queries": 0,
             "cache_hits": 0,
             "embedding_cache_hits": 0,
+            "semantic_cache_hits": 0,
+            "persistent_cache_hits": 0,
             "avg_response_time": 0.0,
             "last_reset_time": time.time(),
         }
@@ -748,25 +1058,35 @@ class RAGTools:
         if not isinstance(max_tokens, int) or max_tokens <= 0:
             raise ValueError("max_tokens must be a positive integer")
 
-        # 按句子分割並限制長度
-        sentences = [s.strip() for s in text.split("。") if s.strip()]
-        if not sentences:
-            return ""
-
-        summary = ""
+        # 按句子逐一切出並限制長度；達到上限即停止，不切分其餘文本
+        parts: List[str] = []
         token_count = 0
 
-        for sentence in sentences:
+        for sentence in self._iter_sentences(text):
             # 估算 token 數量（中文大約 1 字符 = 1 token）
             estimated_tokens = len(sentence)
 
             if token_count + estimated_tokens > max_tokens:
                 break
 
-            summary += sentence + "。"
+            parts.append(sentence)
             token_count += estimated_tokens
 
-        return summary.strip()
+        return "".join(sentence + "。" for sentence in parts).strip()
+
+    @staticmethod
+    def _iter_sentences(text: str):
+        """以「。」逐句產生去除空白後的非空句子"""
+        start = 0
+        length = len(text)
+        while start <= length:
+            end = text.find("。", start)
+            if end == -1:
+                end = length
+            sentence = text[start:end].strip()
+            if sentence:
+                yield sentence
+            start = end + 1
 
     def rebuild_index(self, path: str) -> Dict:
         """重建索引（改進版）
@@ -783,6 +1103,11 @@ class RAGTools:
         try:
             # 使用自動選擇的 collection 名稱
             collection_name = self.config.get_collection_name()
+            persistent_tag = (
+                self._persistent_cache_tag()
+                if self.config.enable_persistent_cache
+                else None
+            )
 
             # 重置 collection
             try:
@@ -790,10 +1115,15 @@ class RAGTools:
             except Exception:
                 logger.warning(f"Collection {collection_name} 不存在，跳過刪除")
 
-            self.collection = self.dbClient.create_collection(collection_name)
+            self.collection = self.dbClient.create_collection(
+                collection_name, metadata=self.config.get_hnsw_metadata()
+            )
 
             # 清空緩存
             self._query_cache.clear()
+            self._semantic_cache.clear()
+            if persistent_tag is not None:
+                self._persistent_cache.evict(persistent_tag)
 
             logger.info(f"索引重建完成: {collection_name}")
             return {
@@ -842,7 +1172,13 @@ class RAGTools:
         self._query_cache.clear()
         self._embedding_cache.clear()
         self._preprocessed_queries.clear()
-        logger.info("所有緩存已清空（查詢、嵌入、預處理）")
+        self._semantic_cache.clear()
+        if self.config.enable_persistent_cache:
+            try:
+                self._persistent_cache.clear()
+            except Exception as e:
+                logger.warning(f"清空磁碟快取失敗: {e}")
+        logger.info("所有緩存已清空（查詢、嵌入、預處理、語意、磁碟）")
 
     def optimize_performance(self) -> Dict[str, str]:
         """性能優化建議 💡"""
@@ -873,6 +1209,25 @@ class RAGTools:
 
 
 # 向後兼容的便利函數
+# 程序共用的 RAGTools 實例（延遲初始化）
+_default_rag_tools: Optional[RAGTools] = None
+_default_rag_tools_lock = threading.Lock()
+
+
+def get_default_rag_tools() -> RAGTools:
+    """取得程序共用的 RAGTools 實例，首次呼叫時才載入模型與資料庫
+
+    Returns:
+        RAGTools: 共用實例
+    """
+    global _default_rag_tools
+    if _default_rag_tools is None:
+        with _default_rag_tools_lock:
+            if _default_rag_tools is None:
+                _default_rag_tools = RAGTools()
+    return _default_rag_tools
+
+
 def rag_search(query: str, top_k: int = 5) -> List[SearchResult]:
     """快速 RAG 搜索函數（向後兼容）
 
@@ -883,8 +1238,7 @@ def rag_search(query: str, top_k: int = 5) -> List[SearchResult]:
     Returns:
         List[SearchResult]: 搜索結果列表
     """
-    rag_tools = RAGTools()
-    return rag_tools.rag_search(query, top_k)
+    return get_default_rag_tools().rag_search(query, top_k)
 
 
 if __name__ == "__main__":
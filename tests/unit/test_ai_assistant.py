@@ -1,8 +1,11 @@
 """Unit tests for the InfographicAssistantAgent."""
 
+import asyncio
+
 import pytest
 
-from src.backend.cms import InfographicAssistantAgent
+from src.backend.cache import PersistentCache, SemanticCache
+from src.backend.cms import InfographicAssistantAgent, TitleTagSuggestion
 
 
 class TestInfographicAssistantAgent:
@@ -52,6 +55,48 @@ class TestInfographicAssistantAgent:
         assert "翻譯指南" in instructions
         assert "標籤建議規則" in instructions
 
+    def test_get_agent_is_shared_per_tag_set(self):
+        """Test the convenience factory reuses one agent per tag set."""
+        from src.backend.cms.ai_assistant import _get_agent
+
+        agent = _get_agent(("AI", "CICD"))
+
+        assert _get_agent(tuple(sorted(["CICD", "AI"]))) is agent
+        assert '"title_en"' in agent._build_instructions()
+
+    def test_caches_are_shared_across_agents(self):
+        """Test agents share one suggestion cache instead of opening their own."""
+        first = InfographicAssistantAgent(existing_tags=["AI"])
+        second = InfographicAssistantAgent(existing_tags=["CICD"])
+
+        assert first._suggest_cache is second._suggest_cache
+        assert first._semantic_cache is second._semantic_cache
+
+    def test_model_client_is_rebuilt_per_event_loop(self, monkeypatch):
+        """Test a new event loop gets a fresh client and the old one is closed."""
+        agent = InfographicAssistantAgent(existing_tags=["AI"])
+        closed = []
+
+        async def bound_agent():
+            first = await agent._agent_for_running_loop()
+            assert await agent._agent_for_running_loop() is first
+            return first
+
+        first = asyncio.run(bound_agent())
+        old_client = agent._client
+
+        async def fake_close():
+            closed.append(old_client)
+
+        monkeypatch.setattr(old_client, "close", fake_close)
+        second = asyncio.run(bound_agent())
+
+        assert second is not first
+        assert second.model is not first.model
+        assert second.instructions == first.instructions
+        assert closed == [old_client]
+        assert agent._client is not old_client
+
 
 @pytest.mark.asyncio
 class TestInfographicAssistantAgentAsync:
@@ -82,3 +127,54 @@ class TestInfographicAssistantAgentAsync:
     # - Valid GitHub Copilot API token
     # - Network connectivity
     # - Should be run separately as integration tests
+
+    async def test_suggest_metadata_batch_keeps_order(self, monkeypatch):
+        """Test batch suggestions keep input order and map failures to None."""
+        agent = InfographicAssistantAgent()
+
+        async def fake_suggest(title_zh):
+            if title_zh == "失敗":
+                raise RuntimeError("boom")
+            return TitleTagSuggestion(title_en=title_zh, suggested_tags=["AI"])
+
+        monkeypatch.setattr(agent, "suggest_metadata", fake_suggest)
+
+        results = await agent.suggest_metadata_batch(["一", "失敗", "二"])
+
+        assert [r.title_en if r else None for r in results] == ["一", None, "二"]
+
+    async def test_suggest_metadata_uses_persistent_cache(self, tmp_path):
+        """Test a cached title is returned without calling the LLM."""
+        agent = InfographicAssistantAgent(existing_tags=["AI"])
+        agent._enable_suggest_cache = True
+        agent._suggest_cache = PersistentCache(str(tmp_path / "suggest.sqlite3"))
+        cached = TitleTagSuggestion(title_en="Cached", suggested_tags=["AI"])
+        agent._store_cached_suggestion("快取標題", cached)
+
+        result = await agent.suggest_metadata(" 快取標題 ")
+
+        assert result == cached
+        other_tags = InfographicAssistantAgent(existing_tags=["CICD"])
+        key = agent._suggest_cache_key("快取標題")
+        assert other_tags._suggest_cache_key("快取標題") != key
+
+    async def test_suggest_metadata_uses_semantic_cache(self, tmp_path, monkeypatch):
+        """Test a paraphrased title reuses a semantically similar suggestion."""
+        agent = InfographicAssistantAgent(existing_tags=["CICD"])
+        agent._enable_suggest_cache = False
+        agent._enable_semantic_cache = True
+        agent._semantic_cache = SemanticCache(threshold=0.92)
+        cached = TitleTagSuggestion(title_en="Jenkins CI/CD", suggested_tags=["CICD"])
+        agent._semantic_cache.set(
+            [1.0, 0.0], cached, partition=agent._semantic_partition
+        )
+
+        async def fake_embed(title_zh):
+            return [0.99, 0.05]
+
+        monkeypatch.setattr(agent, "_embed_title", fake_embed)
+
+        result = await agent.suggest_metadata("用 Jenkins 做 CI/CD 自動化")
+
+        assert result == cached
+        assert result is not cached
@@ -1,14 +1,18 @@
 """ResumeMate Analysis Agent 測試"""
 
+import asyncio
 import pytest
 import sys
 import os
+import time
 
 # 添加 src 目錄到路徑
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
 
 from backend.models import Question, QuestionType, AgentDecision
 from backend.agents import AnalysisAgent
+from backend.agents import analysis as analysis_module
+from backend.agents.analysis import AnalysisDecision, AnalysisOutput
 from backend.tools import RAGTools
 
 
@@ -154,6 +158,133 @@ class TestAnalysisAgent:
             ), f"Low confidence for career question '{question_text}': {result.confidence}"
 
 
+class TestAnalysisOutput:
+    """AnalysisOutput 格式修正測試"""
+
+    def test_decision_and_question_type_aliases(self):
+        """測試 decision / question_type 變體會被標準化"""
+        output = AnalysisOutput.model_validate_json(
+            '{"draft_answer": "", "confidence": "0.9",'
+            ' "question_type": "Skills", "decision": ["Out_Of_Scope"]}'
+        )
+
+        assert output.decision == AnalysisDecision.OUT_OF_SCOPE
+        assert output.question_type == QuestionType.SKILL
+        assert output.confidence == 0.9
+
+    def test_unknown_question_type_falls_back_to_other(self):
+        """測試未知問題類型回退為 OTHER"""
+        output = AnalysisOutput.model_validate(
+            {
+                "draft_answer": "",
+                "confidence": 0.5,
+                "question_type": "hobby",
+                "decision": "ask_clarify",
+                "sources": "resume.md",
+            }
+        )
+
+        assert output.question_type == QuestionType.OTHER
+        assert output.decision == AnalysisDecision.CLARIFY
+        assert output.sources == ["resume.md"]
+
+
+class TestContactShortCircuit:
+    """聯絡資訊問題短路測試"""
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("如何聯絡你？", True),
+            ("What's your email?", True),
+            ("你的技能是什麼？", False),
+            ("Tell me about your pipeline experience", False),
+            ("你在專案中如何與客戶聯繫需求？", False),
+            ("你有做過 email 行銷系統嗎", False),
+            ("contact center 經驗?", False),
+        ],
+    )
+    def test_is_contact_question(self, text, expected):
+        """測試聯絡問題判斷"""
+        assert analysis_module._is_contact_question(text) is expected
+
+    def test_contact_result_marks_contact_tool_source(self):
+        """測試短路結果帶有 get_contact_info 來源標記"""
+        result = AnalysisAgent._contact_result(Question(text="如何聯絡你？"))
+
+        assert result.question_type == QuestionType.CONTACT
+        assert result.decision == AgentDecision.RETRIEVE
+        assert result.metadata["source"] == "get_contact_info"
+        assert result.metadata["used_contact_info_tool"] is True
+        assert "sacahan@gmail.com" in result.draft_answer
+
+    def test_called_tools_reads_tool_call_items(self):
+        """測試從 RunResult.new_items 取出實際呼叫的工具名稱"""
+
+        class _Raw:
+            def __init__(self, name):
+                self.name = name
+
+        class _Item:
+            def __init__(self, item_type, name=None):
+                self.type = item_type
+                self.raw_item = _Raw(name)
+
+        class _Result:
+            new_items = [
+                _Item("tool_call_item", "get_contact_info"),
+                _Item("tool_call_output_item"),
+                _Item("message_output_item"),
+            ]
+
+        assert analysis_module._called_tools(_Result()) == {"get_contact_info"}
+        assert analysis_module._called_tools(object()) == set()
+
+
+class TestSingleflightSearch:
+    """相同檢索請求合併測試"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_queries_search_once(self, monkeypatch):
+        """測試併發的相同查詢只實際檢索一次"""
+        calls = []
+
+        def fake_search(query, top_k):
+            calls.append((query, top_k))
+            time.sleep(0.05)
+            return (["doc-1"], [0.9], ["excerpt"], [{}])
+
+        monkeypatch.setattr(analysis_module, "_search_soa", fake_search)
+
+        results = await asyncio.gather(
+            *(analysis_module._singleflight_search("技能", 5) for _ in range(5))
+        )
+
+        assert calls == [("技能", 5)]
+        assert all(r == results[0] for r in results)
+        assert analysis_module._inflight_searches == {}
+
+    @pytest.mark.asyncio
+    async def test_first_caller_cancel_does_not_cancel_waiters(self, monkeypatch):
+        """測試首位呼叫者取消時，其他等待者仍取得結果"""
+
+        def fake_search(query, top_k):
+            time.sleep(0.05)
+            return (["doc-1"], [0.9], ["excerpt"], [{}])
+
+        monkeypatch.setattr(analysis_module, "_search_soa", fake_search)
+
+        first = asyncio.ensure_future(analysis_module._singleflight_search("技能", 5))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(analysis_module._singleflight_search("技能", 5))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await waiter == (["doc-1"], [0.9], ["excerpt"], [{}])
+        assert first.cancelled()
+        assert analysis_module._inflight_searches == {}
+
+
 if __name__ == "__main__":
     # 執行特定測試
     pytest.main([__file__, "-v"])
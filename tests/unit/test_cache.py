@@ -0,0 +1,121 @@
+"""共用快取元件測試"""
+
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+# 添加 src 目錄到路徑
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from backend.cache import (  # noqa: E402
+    PersistentCache,
+    SemanticCache,
+    TTLCache,
+    loop_bound_cache,
+)
+
+
+class TestTTLCache:
+    """TTLCache 測試"""
+
+    def test_lru_eviction(self):
+        """測試超過容量時淘汰最久未使用的項目"""
+        cache = TTLCache(maxsize=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1  # a 成為最近使用
+        cache.set("c", 3)
+
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_expired_items_are_dropped(self):
+        """測試過期項目不會被回傳"""
+        cache = TTLCache(maxsize=2, ttl_seconds=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestSemanticCache:
+    """SemanticCache 測試"""
+
+    def test_near_duplicate_vector_hits(self):
+        """測試相近向量命中、不同 partition 與相異向量不命中"""
+        rng = np.random.default_rng(0)
+        base = rng.standard_normal(384).astype(np.float32)
+        cache = SemanticCache(threshold=0.95)
+        cache.set(base, ["result"], partition=5)
+
+        near = base + 0.01 * rng.standard_normal(384).astype(np.float32)
+        assert cache.get(near, partition=5) == ["result"]
+        assert cache.get(near, partition=3) is None
+        assert cache.get(-base, partition=5) is None
+
+    def test_clear(self):
+        """測試清空快取"""
+        cache = SemanticCache()
+        cache.set(np.ones(8), "value")
+        cache.clear()
+
+        assert cache.get(np.ones(8)) is None
+        assert len(cache) == 0
+
+
+class TestPersistentCache:
+    """PersistentCache 測試"""
+
+    def test_survives_reopen(self, tmp_path):
+        """測試關閉重開後仍可讀取"""
+        path = str(tmp_path / "cache" / "rag.sqlite3")
+        cache = PersistentCache(path, ttl_seconds=60)
+        cache.set("key", '[{"doc_id": "a"}]', tag="minilm")
+        cache.close()
+
+        reopened = PersistentCache(path, ttl_seconds=60)
+        assert reopened.get("key") == '[{"doc_id": "a"}]'
+
+    def test_expired_and_evicted_items(self, tmp_path):
+        """測試過期與依 tag 失效"""
+        cache = PersistentCache(str(tmp_path / "rag.sqlite3"), ttl_seconds=-1)
+        cache.set("expired", "value")
+        assert cache.get("expired") is None
+
+        cache.ttl_seconds = 60
+        cache.set("a", "1", tag="old-index")
+        cache.set("b", "2", tag="new-index")
+        assert cache.evict("old-index") == 1
+        assert cache.get("a") is None
+        assert cache.get("b") == "2"
+
+
+class TestLoopBoundCache:
+    """依 event loop 快取測試"""
+
+    def test_reuses_within_loop_and_rebuilds_on_new_loop(self):
+        """測試同一 loop 內共用物件，不同 asyncio.run 重新建立"""
+        built = []
+
+        @loop_bound_cache
+        def make_client(name):
+            built.append(name)
+            return object()
+
+        async def fetch_twice():
+            first = make_client("proxy")
+            assert make_client("proxy") is first
+            return first
+
+        first = asyncio.run(fetch_twice())
+        second = asyncio.run(fetch_twice())
+
+        assert first is not second
+        assert built == ["proxy", "proxy"]
+
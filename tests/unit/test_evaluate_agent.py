@@ -0,0 +1,548 @@
+"""ResumeMate Evaluate Agent 測試"""
+
+import asyncio
+import json
+import pytest
+import sys
+import os
+
+# 添加 src 目錄到路徑
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from backend.models import (
+    AgentDecision,
+    AnalysisResult,
+    EvaluationResult,
+    QuestionType,
+    SearchResult,
+)
+from backend.agents import evaluate as evaluate_module
+from backend.cache import SemanticCache, TTLCache
+from backend.agents.evaluate import ESCALATE_MESSAGE, EvaluateAgent
+
+
+def _make_analysis(query: str, confidence: float = 0.9, **kwargs) -> AnalysisResult:
+    return AnalysisResult(
+        query=query,
+        question_type=kwargs.pop("question_type", QuestionType.SKILL),
+        decision=kwargs.pop("decision", AgentDecision.RETRIEVE),
+        confidence=confidence,
+        retrievals=[],
+        draft_answer=kwargs.pop("draft_answer", "草稿"),
+        metadata=kwargs.pop("metadata", {"sources": ["resume.md"]}),
+    )
+
+
+@pytest.fixture
+def evaluate_agent():
+    """不連線 LLM 的 Evaluate Agent（略過 __init__）"""
+    agent = EvaluateAgent.__new__(EvaluateAgent)
+    agent._enable_rule_fast_path = False
+    return agent
+
+
+@pytest.fixture
+def cached_agent(evaluate_agent):
+    """具備各層快取、但語意快取預設停用的 Evaluate Agent"""
+    evaluate_agent.model_name = "test-model"
+    evaluate_agent.response_length = "normal"
+    evaluate_agent._instructions_digest = ""
+    evaluate_agent._response_cache = TTLCache(maxsize=10)
+    evaluate_agent._enable_semantic_cache = False
+    evaluate_agent._semantic_cache = SemanticCache(threshold=0.92)
+    evaluate_agent._enable_escalate_cache = False
+    evaluate_agent._escalate_cache = SemanticCache(threshold=0.92)
+    return evaluate_agent
+
+
+class TestEvaluateBatch:
+    """批次評估測試"""
+
+    @pytest.mark.asyncio
+    async def test_results_keep_order_and_respect_concurrency(
+        self, evaluate_agent, monkeypatch
+    ):
+        """測試結果順序與輸入一致，且同時進行的請求不超過上限"""
+        running = 0
+        peak = 0
+
+        async def fake_evaluate(analysis):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return EvaluationResult(
+                final_answer=analysis.query,
+                sources=[],
+                confidence=1.0,
+                status=AgentDecision.RETRIEVE,
+            )
+
+        monkeypatch.setattr(evaluate_agent, "evaluate", fake_evaluate)
+        analyses = [_make_analysis(f"q{i}") for i in range(6)]
+
+        results = await evaluate_agent.evaluate_batch(analyses, max_concurrency=2)
+
+        assert [r.final_answer for r in results] == [f"q{i}" for i in range(6)]
+        assert peak <= 2
+
+    @pytest.mark.asyncio
+    async def test_exceptions_map_to_fallback_result(self, evaluate_agent, monkeypatch):
+        """測試個別失敗會轉為安全預設值"""
+
+        async def fake_evaluate(analysis):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(evaluate_agent, "evaluate", fake_evaluate)
+
+        results = await evaluate_agent.evaluate_batch([_make_analysis("q")])
+
+        assert results[0].status == AgentDecision.OUT_OF_SCOPE
+        assert results[0].metadata["error"] == "boom"
+
+
+class TestOfflineBatch:
+    """Batch API 離線評估測試"""
+
+    def test_offline_record_maps_to_evaluation(self, evaluate_agent):
+        """測試成功回應解析為評估結果，失敗或缺漏則回傳安全預設值"""
+        analysis = _make_analysis("你的技能？")
+        content = (
+            '{"final_answer": "我擅長 Python", "sources": ["a.md"],'
+            ' "confidence": 0.8, "status": "ok"}'
+        )
+        record = {
+            "custom_id": "x",
+            "response": {
+                "status_code": 200,
+                "body": {"choices": [{"message": {"content": content}}]},
+            },
+            "error": None,
+        }
+        failed = {"custom_id": "y", "response": {"status_code": 500, "body": {}}}
+
+        result = evaluate_agent._offline_evaluation(record, analysis)
+
+        assert result.final_answer == "我擅長 Python"
+        assert result.status == AgentDecision.RETRIEVE
+        assert result.metadata["original_question"] == "你的技能？"
+        assert evaluate_agent._offline_evaluation(failed, analysis).metadata["error"]
+        missing = evaluate_agent._offline_evaluation(None, analysis)
+        assert missing.metadata["error"] == "batch_result_missing"
+
+    @pytest.mark.asyncio
+    async def test_offline_prepare_failure_maps_to_error(
+        self, evaluate_agent, monkeypatch
+    ):
+        """測試單筆輸入準備失敗時回傳錯誤結果，不影響其他項目"""
+        fast = EvaluationResult(
+            final_answer="ok",
+            sources=[],
+            confidence=1.0,
+            status=AgentDecision.RETRIEVE,
+        )
+
+        def fake_prepare(analysis):
+            if analysis.query == "bad":
+                raise ValueError("broken analysis")
+            return fast, None
+
+        monkeypatch.setattr(evaluate_agent, "_prepare_review", fake_prepare)
+
+        results = await evaluate_agent.evaluate_batch_offline(
+            [_make_analysis("bad"), _make_analysis("good")]
+        )
+
+        assert len(results) == 2
+        assert results[0].metadata["error"] == "broken analysis"
+        assert results[1] is fast
+
+
+class TestFastPath:
+    """確定性分支（不呼叫 LLM）測試"""
+
+    def test_contact_tool_result_passes_through(self):
+        """測試聯絡資訊直接通過，信心度與提示詞規則一致"""
+        analysis = _make_analysis(
+            "如何聯絡你？",
+            confidence=0.6,
+            question_type=QuestionType.CONTACT,
+            draft_answer="歡迎透過 email 與我聯絡",
+        )
+
+        result = EvaluateAgent._fast_path_result(analysis, True, [])
+
+        assert result.status == AgentDecision.RETRIEVE
+        assert result.final_answer == "歡迎透過 email 與我聯絡"
+        assert result.confidence == 1.0
+        assert result.metadata["fast_path"] == "contact"
+
+    @pytest.mark.parametrize("confidence, sources", [(0.2, ["resume.md"]), (0.9, [])])
+    def test_low_confidence_or_no_sources_escalates(self, confidence, sources):
+        """測試信心度過低或無來源時升級人工處理"""
+        analysis = _make_analysis("你的技能？", confidence=confidence)
+
+        result = EvaluateAgent._fast_path_result(analysis, False, sources)
+
+        assert result.status == AgentDecision.ESCALATE_TO_HUMAN
+        assert result.final_answer == ESCALATE_MESSAGE
+
+    def test_out_of_scope_and_confident_answers_use_llm(self):
+        """測試超出範圍與高信心度回答仍交由 LLM 評估"""
+        out_of_scope = _make_analysis(
+            "今天天氣如何？", confidence=0.1, decision=AgentDecision.OUT_OF_SCOPE
+        )
+        confident = _make_analysis("你的技能？", confidence=0.9)
+
+        assert EvaluateAgent._fast_path_result(out_of_scope, False, []) is None
+        assert EvaluateAgent._fast_path_result(confident, False, ["a.md"]) is None
+
+    def test_rule_based_fast_path_handles_out_of_scope_and_confident(self):
+        """測試 EVAL_FAST_PATH 開啟時超出範圍與高信心度回答不呼叫 LLM"""
+        out_of_scope = _make_analysis(
+            "今天天氣如何？", confidence=0.1, decision=AgentDecision.OUT_OF_SCOPE
+        )
+        confident = _make_analysis("你的技能？", confidence=0.95)
+        confident.retrievals = [
+            SearchResult(doc_id=f"{i}.md", score=0.8, excerpt="x") for i in range(3)
+        ]
+        weak = _make_analysis("你的技能？", confidence=0.95)
+
+        declined = EvaluateAgent._fast_path_result(out_of_scope, False, [], True)
+        accepted = EvaluateAgent._fast_path_result(confident, False, ["a.md"], True)
+
+        assert declined.status == AgentDecision.OUT_OF_SCOPE
+        assert declined.metadata["fast_path"] == "out_of_scope"
+        assert accepted.status == AgentDecision.RETRIEVE
+        assert accepted.final_answer == "草稿"
+        assert EvaluateAgent._fast_path_result(weak, False, ["a.md"], True) is None
+
+
+class TestEscalateCache:
+    """升級人工處理語意負向快取測試"""
+
+    @pytest.mark.asyncio
+    async def test_similar_question_reuses_llm_escalation(
+        self, cached_agent, monkeypatch
+    ):
+        """測試 LLM 升級過的問題，相近問法不再呼叫 LLM"""
+        evaluate_agent = cached_agent
+        evaluate_agent._enable_escalate_cache = True
+
+        vectors = {"你的薪資多少？": [1.0, 0.0], "薪水大概多少？": [0.99, 0.05]}
+        calls = []
+
+        async def fake_vector(analysis):
+            return vectors[analysis.query]
+
+        async def fake_evaluate_with_sdk(analysis, input_text=None):
+            calls.append(analysis.query)
+            return EvaluationResult(
+                final_answer=ESCALATE_MESSAGE,
+                sources=[],
+                confidence=0.3,
+                status=AgentDecision.ESCALATE_TO_HUMAN,
+                metadata={"sdk_result": True},
+            )
+
+        monkeypatch.setattr(evaluate_agent, "_escalate_cache_vector", fake_vector)
+        monkeypatch.setattr(
+            evaluate_agent, "_evaluate_with_sdk", fake_evaluate_with_sdk
+        )
+
+        await evaluate_agent.evaluate(_make_analysis("你的薪資多少？"))
+        result = await evaluate_agent.evaluate(_make_analysis("薪水大概多少？"))
+
+        assert calls == ["你的薪資多少？"]
+        assert result.status == AgentDecision.ESCALATE_TO_HUMAN
+        assert result.metadata["fast_path"] == "escalate_cache"
+        assert result.metadata["original_question"] == "薪水大概多少？"
+
+    @pytest.mark.asyncio
+    async def test_query_vector_reuses_rag_embedding(self, cached_agent, monkeypatch):
+        """測試升級快取沿用檢索時已快取的查詢向量，不重新編碼"""
+        cached_agent._enable_escalate_cache = True
+        embedded = []
+
+        async def fake_embed(text):
+            embedded.append(text)
+            return [0.0, 1.0]
+
+        monkeypatch.setattr(
+            cached_agent, "_cached_query_embedding", lambda query: [1.0, 0.0]
+        )
+        monkeypatch.setattr(cached_agent, "_embed_text", fake_embed)
+
+        vector = await cached_agent._escalate_cache_vector(_make_analysis("你的薪資？"))
+
+        assert vector == [1.0, 0.0]
+        assert embedded == []
+
+
+class TestSemanticCache:
+    """語意評估快取測試"""
+
+    @pytest.mark.asyncio
+    async def test_similar_analysis_reuses_evaluation_within_question_type(
+        self, cached_agent, monkeypatch
+    ):
+        """測試相近的問題 + 草稿沿用評估結果，但不跨問題類型"""
+        cached_agent._enable_semantic_cache = True
+        calls = []
+
+        async def fake_embed(text):
+            return [1.0, 0.0] if "Python" in text else [0.0, 1.0]
+
+        async def fake_evaluate_with_sdk(analysis, input_text=None):
+            calls.append(analysis.query)
+            return EvaluationResult(
+                final_answer="我擅長 Python",
+                sources=["resume.md"],
+                confidence=0.9,
+                status=AgentDecision.RETRIEVE,
+                metadata={"sdk_result": True},
+            )
+
+        monkeypatch.setattr(cached_agent, "_embed_text", fake_embed)
+        monkeypatch.setattr(cached_agent, "_evaluate_with_sdk", fake_evaluate_with_sdk)
+
+        await cached_agent.evaluate(_make_analysis("你會 Python 嗎？"))
+        hit = await cached_agent.evaluate(_make_analysis("你懂 Python 嗎？"))
+        await cached_agent.evaluate(
+            _make_analysis("Python 專案？", question_type=QuestionType.EXPERIENCE)
+        )
+
+        assert calls == ["你會 Python 嗎？", "Python 專案？"]
+        assert hit.metadata["cache"] == "semantic_hit"
+        assert hit.metadata["original_question"] == "你懂 Python 嗎？"
+
+    @pytest.mark.asyncio
+    async def test_fast_path_skips_embedding(self, cached_agent, monkeypatch):
+        """測試確定性分支不計算語意快取向量"""
+        cached_agent._enable_semantic_cache = True
+        cached_agent._enable_escalate_cache = True
+        embedded = []
+
+        async def fake_embed(text):
+            embedded.append(text)
+            return [1.0, 0.0]
+
+        monkeypatch.setattr(cached_agent, "_embed_text", fake_embed)
+
+        result = await cached_agent.evaluate(_make_analysis("你的技能？", 0.2))
+
+        assert result.metadata["fast_path"] == "low_confidence"
+        assert embedded == []
+
+
+class TestResponseCache:
+    """完全相同 reviewer 輸入的評估快取測試"""
+
+    @pytest.fixture
+    def counting_agent(self, cached_agent, monkeypatch):
+        calls = []
+
+        async def fake_evaluate_with_sdk(analysis, input_text=None):
+            calls.append(input_text)
+            return EvaluationResult(
+                final_answer="我擅長 Python",
+                sources=["resume.md"],
+                confidence=0.9,
+                status=AgentDecision.RETRIEVE,
+                metadata={"sdk_result": True},
+            )
+
+        monkeypatch.setattr(cached_agent, "_evaluate_with_sdk", fake_evaluate_with_sdk)
+        cached_agent.calls = calls
+        return cached_agent
+
+    @pytest.mark.asyncio
+    async def test_identical_input_hits_cache(self, counting_agent):
+        """測試相同分析只呼叫一次 LLM"""
+        await counting_agent.evaluate(_make_analysis("你會 Python 嗎？"))
+        hit = await counting_agent.evaluate(_make_analysis("你會 Python 嗎？"))
+
+        assert len(counting_agent.calls) == 1
+        assert hit.final_answer == "我擅長 Python"
+
+    @pytest.mark.asyncio
+    async def test_confidence_near_threshold_is_not_shared(self, counting_agent):
+        """測試門檻兩側的信心度不共用快取，低於門檻仍走確定性升級"""
+        await counting_agent.evaluate(_make_analysis("你會 Python 嗎？", 0.404))
+        result = await counting_agent.evaluate(
+            _make_analysis("你會 Python 嗎？", 0.396)
+        )
+
+        assert len(counting_agent.calls) == 1
+        assert result.metadata["fast_path"] == "low_confidence"
+
+    @pytest.mark.asyncio
+    async def test_retrieval_excerpts_are_part_of_key(self, counting_agent):
+        """測試檢索摘錄或分數不同時重新評估"""
+        for excerpt, score in (("Python", 0.9), ("Go", 0.9), ("Go", 0.8)):
+            analysis = _make_analysis("你會 Python 嗎？")
+            analysis.retrievals = [
+                SearchResult(doc_id="a.md", score=score, excerpt=excerpt)
+            ]
+            await counting_agent.evaluate(analysis)
+
+        assert len(counting_agent.calls) == 3
+
+
+class TestStreaming:
+    """串流評估測試"""
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ('{"final_answer": "我擅長 Py', "我擅長 Py"),
+            ('{"final_answer":"x\\"y","sources"', 'x"y'),
+            ('{"final_answer":"a\\u4e', "a"),
+            ('{"sources":[]', ""),
+        ],
+    )
+    def test_partial_final_answer(self, text, expected):
+        """測試從未完成的 JSON 擷取 final_answer"""
+        assert evaluate_module._partial_final_answer(text) == expected
+
+    @pytest.mark.asyncio
+    async def test_fast_path_yields_single_result(self, cached_agent):
+        """測試確定性分支只送出一次完整結果"""
+        analysis = _make_analysis("你的技能？", confidence=0.2)
+
+        items = [item async for item in cached_agent.evaluate_streamed(analysis)]
+
+        assert len(items) == 1
+        assert isinstance(items[0], EvaluationResult)
+        assert items[0].status == AgentDecision.ESCALATE_TO_HUMAN
+
+
+class TestStatusMapping:
+    """評估狀態映射測試"""
+
+    @pytest.mark.parametrize(
+        "status, expected",
+        [
+            ("ok", AgentDecision.RETRIEVE),
+            ("needs_edit", AgentDecision.NEEDS_EDIT),
+            ("needs-clarification", AgentDecision.ASK_CLARIFY),
+            ("Out Of Scope", AgentDecision.OUT_OF_SCOPE),
+            ("escalate_to_human", AgentDecision.ESCALATE_TO_HUMAN),
+            ("unknown", AgentDecision.OUT_OF_SCOPE),
+        ],
+    )
+    def test_map_status(self, evaluate_agent, status, expected):
+        """測試狀態字串對應到 AgentDecision"""
+        assert evaluate_agent._map_status_to_agent_decision(status) == expected
+
+
+class TestRetrievalView:
+    """檢索結果精簡視圖測試"""
+
+    def test_dump_search_results_and_dicts(self):
+        """測試 SearchResult 與 dict 皆可轉換，摘錄會被截斷"""
+        retrievals = [
+            SearchResult(doc_id="a.md", score=0.9, excerpt="x" * 1000),
+            {"id": 7, "score": 0.5, "excerpt": None, "extra": "ignored"},
+        ]
+
+        adapter = evaluate_module._RETRIEVAL_LIST
+        dumped = adapter.dump_python(
+            adapter.validate_python(retrievals, from_attributes=True), mode="json"
+        )
+
+        assert dumped[0]["doc_id"] == "a.md"
+        assert len(dumped[0]["excerpt"]) == evaluate_module.MAX_EXCERPT_CHARS
+        assert dumped[1] == {"doc_id": "7", "score": 0.5, "excerpt": "", "metadata": {}}
+
+    def test_review_payload_drops_retrieval_metadata(self, evaluate_agent):
+        """測試送給 reviewer 的檢索結果不含 metadata（DEBUG_EVAL 未開啟）"""
+        analysis = _make_analysis("你的技能？")
+        analysis.retrievals = [
+            SearchResult(doc_id="a.md", score=0.9, excerpt="x", metadata={"k": "v"})
+        ]
+
+        _, input_text = evaluate_agent._prepare_review(analysis)
+
+        retrieval = json.loads(input_text)["analysis_output"]["retrievals"][0]
+        assert retrieval == {"doc_id": "a.md", "score": 0.9, "excerpt": "x"}
+
+
+class TestSafeParseOutput:
+    """評估輸出解析測試"""
+
+    class _Result:
+        def __init__(self, output):
+            self.output = output
+
+        def final_output_as(self, cls):
+            raise TypeError("not an EvaluateOutput")
+
+    @pytest.mark.parametrize(
+        "raw",
+        [
+            '{"final_answer": "我擅長 Python", "sources": "a.md",'
+            ' "confidence": "0.8", "status": "ok", "metadata": null}',
+            {
+                "description": "schema",
+                "example": {
+                    "final_answer": "我擅長 Python",
+                    "sources": ["a.md"],
+                    "confidence": 0.8,
+                    "status": "ok",
+                },
+            },
+        ],
+    )
+    def test_parses_plain_and_schema_like_output(self, evaluate_agent, raw):
+        """測試一般輸出與 schema-like 包裝都能解析並修正格式"""
+        output = evaluate_agent._safe_parse_output(self._Result(raw))
+
+        assert output.final_answer == "我擅長 Python"
+        assert output.sources == ["a.md"]
+        assert output.confidence == 0.8
+        assert output.metadata == {}
+
+    def test_structured_final_output_is_returned_as_is(self, evaluate_agent):
+        """測試 SDK 已產生的 EvaluateOutput 直接沿用"""
+        output = evaluate_module.EvaluateOutput(
+            final_answer="我擅長 Python", sources=["a.md"], confidence=0.8, status="ok"
+        )
+        result = self._Result(None)
+        result.final_output = output
+
+        assert evaluate_agent._safe_parse_output(result) is output
+
+    def test_invalid_output_returns_none(self, evaluate_agent):
+        """測試無法解析時回傳 None"""
+        assert evaluate_agent._safe_parse_output(self._Result("not json")) is None
+
+
+class TestInstructions:
+    """評估提示詞測試"""
+
+    def test_escalate_message_matches_prompt_template(self):
+        """測試程式內的升級話術與提示詞範本一致"""
+        assert ESCALATE_MESSAGE in evaluate_module.DEFAULT_INSTRUCTIONS
+
+    def test_compress_instructions_keeps_code_blocks(self):
+        """測試壓縮只移除程式碼區塊外的裝飾"""
+        text = "## 📏 **標題**  \n\n\n\n內容\n```json\n{\"a\": \"**📏**\"}\n```\n"
+
+        compressed = evaluate_module._compress_instructions(text)
+
+        assert compressed == '## 標題\n\n內容\n```json\n{"a": "**📏**"}\n```'
+
+    def test_instruction_token_budget(self):
+        """測試完整提示詞維持在 token 預算內"""
+        tiktoken = pytest.importorskip("tiktoken")
+        encoding = tiktoken.encoding_for_model("gpt-4o")
+
+        for instructions in evaluate_module._FULL_INSTRUCTIONS.values():
+            assert len(encoding.encode(instructions)) < 2100
+
+
+if __name__ == "__main__":
+    # 執行特定測試
+    pytest.main([__file__, "-v"])
@@ -96,6 +96,36 @@ class TestInfographicsDataManager:
         data = data_manager.load()
         assert len(data.images) == 1
 
+    def test_save_leaves_no_temp_file(self, data_manager):
+        """Test that saving replaces the data file atomically."""
+        item = InfographicItem(
+            id="item_001",
+            url="static/images/test.png",
+            thumbnail="static/images/thumb.webp",
+        )
+        data_manager.add_item(item)
+
+        tmp_file = data_manager.data_file.with_suffix(".json.tmp")
+        assert data_manager.data_file.exists()
+        assert not tmp_file.exists()
+
+    def test_save_keeps_unicode_and_timestamps(self, data_manager):
+        """Test saved JSON keeps Chinese text readable and round-trips datetimes."""
+        item = InfographicItem(
+            id="item_001",
+            url="static/images/test.png",
+            thumbnail="static/images/thumb.webp",
+            title_zh="測試圖表",
+        )
+        data_manager.add_item(item)
+
+        raw = data_manager.data_file.read_text(encoding="utf-8")
+        loaded = data_manager.load().images[0]
+
+        assert "測試圖表" in raw
+        assert '\n  "version"' in raw
+        assert loaded.created_at == item.created_at
+
     def test_update_item(self, data_manager):
         """Test updating an item."""
         item = InfographicItem(
@@ -182,6 +212,79 @@ class TestInfographicsDataManager:
         assert len(ai_items) == 1
         assert ai_items[0].id == "item_001"
 
+    def test_load_reuses_cache_until_file_changes(self, data_manager):
+        """Test load skips re-parsing until the file is modified on disk."""
+        first = data_manager.load()
+
+        assert data_manager.load() is first
+
+        other = InfographicsDataManager(data_manager.data_file)
+        other.add_item(
+            InfographicItem(id="item_001", url="test.png", thumbnail="thumb.webp")
+        )
+
+        assert [img.id for img in data_manager.load().images] == ["item_001"]
+
+    def test_tag_index_follows_updates_and_deletes(self, data_manager):
+        """Test tag lookups stay in sync with updates and deletes."""
+        for i, tags in enumerate([["AI"], ["AI", "Cloud"]]):
+            data_manager.add_item(
+                InfographicItem(
+                    id=f"item_{i}", url=f"{i}.png", thumbnail=f"{i}.webp", tags=tags
+                )
+            )
+
+        updated = data_manager.get_item("item_1").model_copy(update={"tags": ["Data"]})
+        data_manager.update_item(updated)
+
+        assert data_manager.get_all_tags() == ["AI", "Data"]
+        assert [img.id for img in data_manager.get_items_by_tag("AI")] == ["item_0"]
+
+        data_manager.delete_item("item_0")
+
+        assert data_manager.get_all_tags() == ["Data"]
+        assert data_manager.get_items_by_tag("AI") == []
+
+    def test_tag_index_follows_in_place_edits(self, data_manager):
+        """Test editing the returned item in place keeps tag lookups in sync."""
+        data_manager.add_item(
+            InfographicItem(id="item_0", url="0.png", thumbnail="0.webp", tags=["AI"])
+        )
+
+        item = data_manager.get_item("item_0")
+        item.tags = ["Data"]
+        data_manager.update_item(item)
+
+        assert data_manager.get_all_tags() == ["Data"]
+        assert data_manager.get_items_by_tag("AI") == []
+        assert [img.id for img in data_manager.get_items_by_tag("Data")] == ["item_0"]
+
+        data = data_manager.load()
+        data.images[0].tags = ["Cloud"]
+        data_manager.save(data)
+
+        assert data_manager.get_all_tags() == ["Cloud"]
+
+        data.images[0].tags = ["Edge"]
+        data_manager.delete_item("item_0")
+
+        assert data_manager.get_all_tags() == []
+
+    def test_add_and_delete_items_in_batch(self, data_manager):
+        """Test batched add/delete keep order and skip duplicates."""
+        items = [
+            InfographicItem(id=f"item_{i}", url=f"{i}.png", thumbnail=f"{i}.webp")
+            for i in range(3)
+        ]
+
+        assert data_manager.add_items(items + [items[0]]) == 3
+        assert data_manager.add_items([items[1]]) == 0
+
+        deleted = data_manager.delete_items(["item_0", "item_2", "missing"])
+
+        assert [img.id for img in deleted] == ["item_0", "item_2"]
+        assert [img.id for img in data_manager.load().images] == ["item_1"]
+
 
 class TestImageProcessor:
     """Tests for image processing operations."""
@@ -215,6 +318,104 @@ class TestImageProcessor:
         assert processor.images_dir.exists()
         assert processor.thumbnails_dir.exists()
 
+    def test_large_image_uses_cwebp(self, processor, tmp_path, monkeypatch):
+        """Test that large images are encoded with multi-threaded cwebp."""
+        from src.backend.cms import processor as processor_module
+
+        source = tmp_path / "large.png"
+        source.write_bytes(b"0" * (processor_module.CWEBP_MIN_BYTES + 1))
+        target = tmp_path / "large.webp"
+        calls = []
+
+        monkeypatch.setattr(
+            processor_module.shutil, "which", lambda name: "/usr/bin/cwebp"
+        )
+        monkeypatch.setattr(
+            processor_module.subprocess,
+            "run",
+            lambda cmd, **kwargs: calls.append(cmd),
+        )
+
+        assert processor._convert_with_cwebp(source, target) is True
+        assert "-mt" in calls[0]
+        assert calls[0][-1] == str(target)
+
+    def test_cwebp_thumbnail_decodes_source_once(
+        self, processor, tmp_path, monkeypatch
+    ):
+        """Test the cwebp path builds the thumbnail from the source image."""
+        from PIL import Image
+
+        from src.backend.cms import processor as processor_module
+
+        source = tmp_path / "large.png"
+        Image.new("RGB", (800, 600), "red").save(source)
+        target = processor.images_dir / "large.webp"
+        monkeypatch.setattr(processor, "_convert_with_cwebp", lambda s, t: True)
+        opened = []
+        real_open = processor_module.Image.open
+
+        def tracking_open(path, *args, **kwargs):
+            opened.append(path)
+            return real_open(path, *args, **kwargs)
+
+        monkeypatch.setattr(processor_module.Image, "open", tracking_open)
+
+        thumb = processor._convert_to_webp(source, target, with_thumbnail=True)
+
+        assert opened == [source]
+        assert thumb == processor.thumbnails_dir / "large_thumb.webp"
+        assert thumb.exists()
+
+    def test_pool_workers_skip_cwebp(self, processor, tmp_path, monkeypatch):
+        """Test pool workers stay on Pillow instead of oversubscribing cores."""
+        from src.backend.cms import processor as processor_module
+
+        source = tmp_path / "large.png"
+        source.write_bytes(b"0" * (processor_module.CWEBP_MIN_BYTES + 1))
+        monkeypatch.setattr(
+            processor_module.shutil, "which", lambda name: "/usr/bin/cwebp"
+        )
+        monkeypatch.setattr(processor_module, "_IN_POOL_WORKER", True)
+
+        assert processor._convert_with_cwebp(source, tmp_path / "l.webp") is False
+
+    def test_small_image_skips_cwebp(self, processor, tmp_path, monkeypatch):
+        """Test that small images stay on the Pillow encoder."""
+        from src.backend.cms import processor as processor_module
+
+        source = tmp_path / "small.png"
+        source.write_bytes(b"0" * 10)
+        monkeypatch.setattr(
+            processor_module.shutil, "which", lambda name: "/usr/bin/cwebp"
+        )
+
+        assert processor._convert_with_cwebp(source, tmp_path / "s.webp") is False
+
+    def test_process_uploaded_images_in_parallel(self, processor, tmp_path):
+        """Test batch processing keeps input order and writes all outputs."""
+        from PIL import Image
+
+        sources = []
+        for i, color in enumerate(["red", "blue"]):
+            path = tmp_path / f"upload_{i}.png"
+            Image.new("RGB", (800, 600), color).save(path)
+            sources.append(path)
+
+        items = processor.process_uploaded_images(
+            sources,
+            metadata=[{"title_zh": "紅"}, {"title_zh": "藍", "tags": ["AI"]}],
+            max_workers=2,
+        )
+
+        assert [item.id for item in items] == [
+            processor.generate_id(path) for path in sources
+        ]
+        assert items[1].tags == ["AI"]
+        for item in items:
+            assert (processor.images_dir / f"{item.id}.webp").exists()
+            assert (processor.thumbnails_dir / f"{item.id}_thumb.webp").exists()
+
 
 class TestTitleTagSuggestion:
     """Tests for the TitleTagSuggestion model."""
@@ -81,6 +81,36 @@ def test_rag_config_defaults_to_local_minilm(
     assert config.get_collection_name() == "markdown_documents_minilm"
 
 
+def test_rag_config_hnsw_metadata_from_env(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """HNSW 參數應可由環境變數設定並轉為 collection metadata。"""
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "local")
+    monkeypatch.setenv("HNSW_M", "32")
+    monkeypatch.setenv("HNSW_SEARCH_EF", "128")
+
+    metadata = RAGConfig.from_env().get_hnsw_metadata()
+
+    assert metadata["hnsw:M"] == 32
+    assert metadata["hnsw:search_ef"] == 128
+    assert metadata["hnsw:construction_ef"] == 200
+    assert metadata["hnsw:space"] == "l2"
+
+
+def test_rag_config_persistent_cache_is_opt_in(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """磁碟查詢快取預設關閉，需以環境變數明確開啟。"""
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "local")
+    monkeypatch.delenv("RAG_PERSISTENT_CACHE", raising=False)
+
+    assert RAGConfig.from_env().enable_persistent_cache is False
+
+    monkeypatch.setenv("RAG_PERSISTENT_CACHE", "true")
+
+    assert RAGConfig.from_env().enable_persistent_cache is True
+
+
 def test_rag_config_rejects_non_local_provider(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
@@ -136,3 +166,73 @@ def test_auto_migrate_from_openai_collection_runs_once(tmp_path) -> None:
 
     tools._auto_migrate_from_openai_collection("markdown_documents_minilm")
     assert len(target_collection.upsert_calls) == 1
+
+
+class FakeQueryCollection:
+    """記錄 query 呼叫的 collection stub。"""
+
+    def __init__(self) -> None:
+        self.query_calls: list[list[list[float]]] = []
+
+    def count(self) -> int:
+        return 1
+
+    def query(
+        self,
+        query_embeddings: list[list[float]],
+        n_results: int,
+        include: list[str],
+    ) -> dict[str, Any]:
+        self.query_calls.append(query_embeddings)
+        rows = range(len(query_embeddings))
+        return {
+            "ids": [[f"doc-{row}"] for row in rows],
+            "documents": [[f"resume section {row}"] for row in rows],
+            "metadatas": [[{"source": "resume.md"}] for _ in rows],
+            "distances": [[0.2] for _ in rows],
+        }
+
+
+def test_rag_search_batch_uses_single_encode_and_query(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """批次檢索應只做一次 encode 與一次向量查詢，並保持輸入順序。"""
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(RAGTools, "_initialize_db", lambda self: None)
+
+    tools = RAGTools()
+    tools.collection = FakeQueryCollection()
+    encode_calls: list[list[str]] = []
+
+    def fake_embed(texts: list[str]) -> list[list[float]]:
+        encode_calls.append(list(texts))
+        return [[0.1, 0.2] for _ in texts]
+
+    tools._embed_texts_local = fake_embed
+
+    results = tools.rag_search_batch(["Python 經驗", "AI 專案", "Python 經驗"], 3)
+
+    assert len(encode_calls) == 1
+    assert encode_calls[0] == ["Python 經驗", "AI 專案"]
+    assert len(tools.collection.query_calls) == 1
+    assert [r[0].doc_id for r in results] == ["doc-0", "doc-1", "doc-0"]
+
+
+def test_warmup_bypasses_caches_and_stats(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """預熱應實際 encode 與查詢，但不寫入任何快取或檢索統計。"""
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(RAGTools, "_initialize_db", lambda self: None)
+
+    tools = RAGTools()
+    tools.collection = FakeQueryCollection()
+    tools._embed_texts_local = lambda texts: [[0.1, 0.2] for _ in texts]
+    stats_before = dict(tools._query_stats)
+
+    tools.warmup()
+
+    assert len(tools.collection.query_calls) == 1
+    assert len(tools._query_cache) == 0
+    assert len(tools._embedding_cache) == 0
+    assert tools._query_stats == stats_before